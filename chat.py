@@ -7,5 +7,14 @@ locale.setlocale(locale.LC_ALL, "")
 curses.set_escdelay(25)
 
 
-def run_chat_console(conf, rc):
-    curses.wrapper(lambda stdscr: TUI(stdscr, conf, rc).loop())
+def run_chat_console(conf, rc, watcher=None):
+    def _run(stdscr):
+        tui = TUI(stdscr, conf, rc, watcher)
+        try:
+            tui.loop()
+        finally:
+            tui.stop.set()
+            if watcher is not None:
+                watcher.unsubscribe(tui._on_config)
+
+    curses.wrapper(_run)
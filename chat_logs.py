@@ -1,11 +1,20 @@
+import ctypes
+import ctypes.util
 import glob
 import gzip
+import json
 import os
 import re
-import time
+import select
+import sys
+
+import metrics
 
 CHAT_MAIN = re.compile(r"^\[([0-9]{2}:[0-9]{2}:[0-9]{2})\].*?: <([^>]+)> (.*)$")
 CHAT_SERVER = re.compile(r"^\[([0-9]{2}:[0-9]{2}:[0-9]{2})\].*?\]: \[(?:Server|RCON|Rcon)\] (.*)$")
+JOIN_LEAVE = re.compile(
+    r"^\[([0-9]{2}:[0-9]{2}:[0-9]{2})\] \[Server thread/INFO\]: ([A-Za-z0-9_]{1,16}) (joined|left) the game"
+)
 
 
 def _tail_last_lines(path, n=200):
@@ -29,19 +38,79 @@ def _tail_last_lines(path, n=200):
         return []
 
 
+# Réveil du suiveur par inotify (Linux, via ctypes) sur le dossier des logs : écriture, création,
+# déplacement ou suppression d'un fichier, ou déplacement du dossier lui-même.
+class _Inotify:
+    IN_MODIFY = 0x002
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_MOVE_SELF = 0x800
+    IN_CLOEXEC = 0o2000000
+    IN_NONBLOCK = 0o4000
+    MASK = IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+    def __init__(self, fd: int):
+        self.fd = fd
+
+    @staticmethod
+    def create(directory: str):
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+            fd = libc.inotify_init1(_Inotify.IN_NONBLOCK | _Inotify.IN_CLOEXEC)
+            if fd < 0:
+                return None
+            if libc.inotify_add_watch(fd, os.fsencode(directory), _Inotify.MASK) < 0:
+                os.close(fd)
+                return None
+        except (OSError, AttributeError):
+            return None
+        return _Inotify(fd)
+
+    def wait(self, timeout: float) -> bool:
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return False
+        # Le détail des événements importe peu : le suiveur relit puis revérifie le fichier
+        while True:
+            try:
+                if not os.read(self.fd, 65536):
+                    break
+            except (BlockingIOError, InterruptedError):
+                break
+        return True
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+READ_CHUNK = 1 << 16
+WATCH_TIMEOUT_S = 0.5
+POLL_MIN_S = 0.05
+POLL_MAX_S = 1.0
+
+
 class LogTail:
     def __init__(self, path):
         self.path = path
         self.pos = None
         self.inode = None
         self.preloaded = False
+        self._reopen = False
 
     def _open(self):
-        f = open(self.path, encoding="utf-8", errors="ignore")
+        f = open(self.path, "rb")
         st = os.fstat(f.fileno())
         inode = st.st_ino
-        size = st.st_size
         if self.inode != inode:
+            if self.inode is not None:
+                metrics.LOGTAIL_ROTATIONS.inc()
             self.inode = inode
             self.pos = 0
             self.preloaded = False
@@ -50,34 +119,93 @@ class LogTail:
         f.seek(self.pos, os.SEEK_SET)
         return f
 
+    def _rotated(self) -> bool:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            # Ancien fichier déplacé, nouveau pas encore créé : on garde l'ancien en attendant
+            return False
+        if st.st_ino != self.inode:
+            return True
+        if st.st_size < self.pos:
+            # copytruncate : même inode, contenu remis à zéro ; on relit depuis le début
+            metrics.LOGTAIL_ROTATIONS.inc()
+            self.pos = 0
+            return True
+        return False
+
     def follow(self, stop_event):
         if not self.preloaded:
             for line in _tail_last_lines(self.path, n=200):
                 yield line
             self.preloaded = True
-        while not stop_event.is_set():
-            try:
-                with self._open() as f:
-                    while not stop_event.is_set():
-                        line = f.readline()
-                        if not line:
-                            self.pos = f.tell()
-                            time.sleep(0.1)
-                            break
-                        self.pos = f.tell()
-                        yield line.rstrip("\n")
-            except FileNotFoundError:
-                time.sleep(0.5)
+        watched = os.path.dirname(os.path.abspath(self.path))
+        watch = _Inotify.create(watched)
+        idle = POLL_MIN_S
+        f = None
+        buf = b""
+        try:
+            while not stop_event.is_set():
+                if f is None or self._reopen:
+                    self._reopen = False
+                    if f is not None:
+                        f.close()
+                        f = None
+                    buf = b""
+                    d = os.path.dirname(os.path.abspath(self.path))
+                    if d != watched:
+                        # Chemin du log changé en cours de route : on surveille le nouveau dossier
+                        if watch is not None:
+                            watch.close()
+                        watched, watch = d, _Inotify.create(d)
+                    try:
+                        f = self._open()
+                    except FileNotFoundError:
+                        f = None
+                if f is not None:
+                    chunk = f.read(READ_CHUNK)
+                    if chunk:
+                        # Lecture par blocs ; une ligne incomplète attend la suite dans buf
+                        *lines, buf = (buf + chunk).split(b"\n")
+                        self.pos = f.tell() - len(buf)
+                        metrics.LOGTAIL_LINES.inc(len(lines))
+                        for ln in lines:
+                            yield ln.decode("utf-8", errors="ignore").rstrip("\r")
+                        idle = POLL_MIN_S
+                        continue
+                    if self._rotated():
+                        self._reopen = True
+                        continue
+                if watch is not None:
+                    watch.wait(WATCH_TIMEOUT_S)
+                else:
+                    # Sans inotify : attente qui s'allonge tant que le fichier ne bouge pas
+                    stop_event.wait(idle)
+                    idle = min(POLL_MAX_S, idle * 2)
+        finally:
+            if f is not None:
+                f.close()
+            if watch is not None:
+                watch.close()
 
     def force_refresh(self):
         try:
-            with open(self.path, encoding="utf-8", errors="ignore") as f:
+            with open(self.path, "rb") as f:
                 f.seek(0, os.SEEK_END)
                 self.pos = f.tell()
+                self.inode = os.fstat(f.fileno()).st_ino
+            self._reopen = True
         except Exception:
             pass
 
 
+def parse_join_leave(line):
+    m = JOIN_LEAVE.match(line)
+    if m:
+        return m.group(1), m.group(2), "join" if m.group(3) == "joined" else "leave"
+    return None
+
+
 def parse_chat(line):
     m = CHAT_MAIN.match(line)
     if m:
@@ -88,16 +216,98 @@ def parse_chat(line):
     return None
 
 
-def iter_archives(path):
+def parse_event(line):
+    m = parse_chat(line)
+    if m:
+        return m
+    m = parse_join_leave(line)
+    if m:
+        ts, name, kind = m
+        return ts, "", f"{name} {'joined' if kind == 'join' else 'left'} the game", "event_" + kind
+    return None
+
+
+ARCHIVE_CACHE_VERSION = 1
+
+
+def _parse_archive(fp) -> tuple[list, bool]:
+    events = []
+    try:
+        with gzip.open(fp, "rt", encoding="utf-8", errors="ignore") as g:
+            for line in g:
+                ev = parse_event(line.rstrip("\n"))
+                if ev:
+                    events.append(ev)
+    except Exception:
+        return events, False
+    return events, True
+
+
+def _load_cached(cache_fp, size, mtime_ns):
+    try:
+        with open(cache_fp, encoding="utf-8") as f:
+            data = json.load(f)
+        if (data["v"], data["size"], data["mtime_ns"]) == (ARCHIVE_CACHE_VERSION, size, mtime_ns):
+            return data["events"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _store_cached(cache_fp, size, mtime_ns, events):
+    tmp = cache_fp + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {"v": ARCHIVE_CACHE_VERSION, "size": size, "mtime_ns": mtime_ns, "events": events},
+                f,
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+        os.replace(tmp, cache_fp)
+    except OSError:
+        pass
+
+
+# Événements (ts, auteur, message, type) des archives .log.gz, séparateur de date compris. Chaque archive
+# est analysée une seule fois : ses événements sont gardés dans cache_dir, un fichier par archive, valable
+# tant que (nom, taille, mtime) ne change pas. Les fichiers d'archives disparues sont supprimés.
+def iter_archive_events(path, cache_dir=""):
     d = os.path.dirname(path)
     files = sorted(glob.glob(os.path.join(d, "*.log.gz")))
+    if cache_dir:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+        except OSError:
+            cache_dir = ""
+    kept = set()
     for fp in files:
         bn = os.path.basename(fp)
-        date = bn[:10]
-        yield "__SEP__ " + date
+        yield "--", "", "--- " + bn[:10] + " ---", "date_sep"
         try:
-            with gzip.open(fp, "rt", encoding="utf-8", errors="ignore") as g:
-                for line in g:
-                    yield line.rstrip("\n")
-        except Exception:
+            st = os.stat(fp)
+        except OSError:
             continue
+        events = None
+        cache_fp = ""
+        if cache_dir:
+            cache_fp = os.path.join(cache_dir, bn + ".json")
+            kept.add(bn + ".json")
+            events = _load_cached(cache_fp, st.st_size, st.st_mtime_ns)
+        if events is not None:
+            metrics.ARCHIVE_CACHE.inc(result="hit")
+        else:
+            metrics.ARCHIVE_CACHE.inc(result="miss")
+            events, complete = _parse_archive(fp)
+            # Une archive illisible n'est pas mise en cache : elle sera réessayée
+            if cache_fp and complete:
+                _store_cached(cache_fp, st.st_size, st.st_mtime_ns, events)
+        for ev in events:
+            yield tuple(ev)
+    if cache_dir:
+        try:
+            for name in os.listdir(cache_dir):
+                if name.endswith(".log.gz.json") and name not in kept:
+                    os.remove(os.path.join(cache_dir, name))
+        except OSError:
+            pass
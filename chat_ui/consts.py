@@ -1,5 +1 @@
-LOG_PATH = "/srv/minecraft/logs/latest.log"
-PLAYERDATA_DIR = "/srv/minecraft/world/playerdata"
-USERNAMECACHE = "/srv/minecraft/usernamecache.json"
-NBT_PY = "/srv/minecraft/rcon/nbt.py"
 B = {"tl": "╭", "tr": "╮", "bl": "╰", "br": "╯", "h": "─", "v": "│", "tee_l": "├", "tee_r": "┤"}
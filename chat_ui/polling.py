@@ -7,6 +7,12 @@ import subprocess
 import sys
 import time
 
+from metrics import observe_poll
+
+
+def _value(v):
+    return v() if callable(v) else v
+
 
 def _resolve_playerdata_dir(playerdata_dir: str) -> str:
     if os.path.isdir(playerdata_dir):
@@ -42,6 +48,8 @@ def _run_nbt(nbt_py: str, playerdata_dir: str, usernamecache: str):
 
 def poll_dims(stop_event, nbt_py, playerdata_dir, usernamecache, interval_s, setter):
     while not stop_event.is_set():
+        t0 = time.monotonic()
+        failed = False
         try:
             p = _run_nbt(nbt_py, playerdata_dir, usernamecache)
             if p.returncode == 0 and p.stdout:
@@ -58,7 +66,8 @@ def poll_dims(stop_event, nbt_py, playerdata_dir, usernamecache, interval_s, set
                 if out:
                     setter(out)
         except Exception:
-            pass
+            failed = True
+        observe_poll("dims", t0, failed)
         for _ in range(int(interval_s * 10)):
             if stop_event.is_set():
                 break
@@ -67,6 +76,8 @@ def poll_dims(stop_event, nbt_py, playerdata_dir, usernamecache, interval_s, set
 
 def poll_stats(stop_event, nbt_py, playerdata_dir, usernamecache, interval_s, setter):
     while not stop_event.is_set():
+        t0 = time.monotonic()
+        failed = False
         try:
             p = _run_nbt(nbt_py, playerdata_dir, usernamecache)
             players, cur = [], None
@@ -103,7 +114,8 @@ def poll_stats(stop_event, nbt_py, playerdata_dir, usernamecache, interval_s, se
             if players:
                 setter(players)
         except Exception:
-            pass
+            failed = True
+        observe_poll("stats", t0, failed)
         for _ in range(int(interval_s * 10)):
             if stop_event.is_set():
                 break
@@ -182,8 +194,12 @@ def query_players(host, port, timeout=1.5):
 def poll_query(stop_event, playerdata_dir, interval_s, setter, host_override=None, port_override=None):
     last_ok = None
     while not stop_event.is_set():
+        t0 = time.monotonic()
+        failed = False
         try:
-            host, port, enabled = _resolve_query_target(playerdata_dir, host_override, port_override)
+            host, port, enabled = _resolve_query_target(
+                _value(playerdata_dir), _value(host_override), _value(port_override)
+            )
             if not enabled:
                 pass
             else:
@@ -191,10 +207,12 @@ def poll_query(stop_event, playerdata_dir, interval_s, setter, host_override=Non
                 setter(set(names))
                 last_ok = True
         except Exception:
+            failed = True
             if last_ok is None:
                 setter(set())
             last_ok = False
-        for _ in range(int(interval_s * 10)):
+        observe_poll("query", t0, failed)
+        for _ in range(int(_value(interval_s) * 10)):
             if stop_event.is_set():
                 break
             time.sleep(0.1)
@@ -228,6 +246,8 @@ def poll_stats_dims(
 ):
     last_mtime = 0.0
     while not stop_event.is_set():
+        t0 = time.monotonic()
+        failed = False
         try:
             real_dir = _resolve_playerdata_dir(playerdata_dir)
             cur_mtime = _max_mtime(real_dir, [usernamecache])
@@ -272,7 +292,8 @@ def poll_stats_dims(
                         setter_dims(dims)
                 last_mtime = cur_mtime
         except Exception:
-            pass
+            failed = True
+        observe_poll("stats_dims", t0, failed)
         for _ in range(int(interval_s * 10)):
             if stop_event.is_set():
                 break
@@ -315,6 +336,8 @@ def _fmt_pos(s):
 
 def poll_stats_rcon(stop_event, rcon, interval_s, setter_stats, setter_dims):
     while not stop_event.is_set():
+        t0 = time.monotonic()
+        failed = False
         try:
             names = _parse_list_names(rcon.cmd("list"))
             if not names:
@@ -350,7 +373,8 @@ def poll_stats_rcon(stop_event, rcon, interval_s, setter_stats, setter_dims):
                 setter_stats(players)
                 setter_dims(dims)
         except Exception:
-            pass
+            failed = True
+        observe_poll("stats_rcon", t0, failed)
         for _ in range(int(interval_s * 10)):
             if stop_event.is_set():
                 break
@@ -490,12 +514,17 @@ def poll_stats_hybrid(
     first = True
     while not stop_event.is_set():
         now = time.time()
+        t0 = time.monotonic()
+        failed = False
         try:
-            real_dir = _resolve_playerdata_dir(playerdata_dir)
-            cur_mtime = _max_mtime(real_dir, [usernamecache])
-            need_nbt = first or (cur_mtime > last_mtime) or (now - last_nbt_time >= nbt_refresh_s)
+            nbt_py_v = _value(nbt_py)
+            playerdata_v = _value(playerdata_dir)
+            usernamecache_v = _value(usernamecache)
+            real_dir = _resolve_playerdata_dir(playerdata_v)
+            cur_mtime = _max_mtime(real_dir, [usernamecache_v])
+            need_nbt = first or (cur_mtime > last_mtime) or (now - last_nbt_time >= _value(nbt_refresh_s))
             if need_nbt:
-                cache_nbt = _read_nbt_players(nbt_py, playerdata_dir, usernamecache)
+                cache_nbt = _read_nbt_players(nbt_py_v, playerdata_v, usernamecache_v)
                 last_mtime = cur_mtime
                 last_nbt_time = now
                 first = False
@@ -520,7 +549,7 @@ def poll_stats_hybrid(
                 if names_online
                 else {}
             )
-            names_all = set(cache_nbt.keys()) | set(names_online) | _read_usernamecache_names(usernamecache)
+            names_all = set(cache_nbt.keys()) | set(names_online) | _read_usernamecache_names(usernamecache_v)
             players = []
             dims = {}
             for n in sorted(names_all):
@@ -555,8 +584,9 @@ def poll_stats_hybrid(
             setter_stats(players)
             setter_dims(dims)
         except Exception:
-            pass
-        for _ in range(int(interval_s * 10)):
+            failed = True
+        observe_poll("stats_hybrid", t0, failed)
+        for _ in range(int(_value(interval_s) * 10)):
             if stop_event.is_set():
                 break
             time.sleep(0.1)
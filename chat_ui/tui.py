@@ -12,11 +12,12 @@ import threading
 import time
 from collections import deque
 
-from chat_logs import LogTail, iter_archives, parse_chat
+from chat_logs import LogTail, iter_archive_events, parse_event
 from chat_markdown import render_segments
+from config import Config
 from mc_commands import COMMANDS, STRUCTURES, suggest_commands
 
-from .consts import LOG_PATH, NBT_PY, PLAYERDATA_DIR, USERNAMECACHE, B
+from .consts import B
 from .polling import poll_query, poll_stats_hybrid
 from .stats_view import StatsView
 from .utils import add_safe
@@ -29,7 +30,7 @@ except Exception:
 
 
 class TUI:
-    def __init__(self, stdscr, conf, rc):
+    def __init__(self, stdscr, conf, rc, watcher=None):
         locale.setlocale(locale.LC_ALL, "")
         curses.curs_set(0)
         curses.use_default_colors()
@@ -38,6 +39,8 @@ class TUI:
         self.stats_view = StatsView()
         self.stdscr = stdscr
         self.conf = conf or {}
+        self.watcher = watcher
+        self.cfg = watcher.current if watcher is not None else Config.from_dict(self.conf)
         self._init_colors()
         self.chat_lines = []
         self._dedup_keys = set()
@@ -52,7 +55,7 @@ class TUI:
         self.scroll = 0
         self.help_view = "cmd"
         self.help_scroll = 0
-        self.tail = LogTail(LOG_PATH)
+        self.tail = LogTail(self.cfg.chat.log_path)
         self.q = queue.Queue()
         self.stop = threading.Event()
         threading.Thread(target=self._reader_loop, daemon=True).start()
@@ -60,32 +63,36 @@ class TUI:
         self.rcon_status = "Connecté en RCON" if self.rcon else "Erreur RCON : non initialisé"
         self.dim_map = {}
         self.stats_data = []
-        self.stats_interval = 1
-        self._sat_cache = {}
         threading.Thread(
             target=poll_stats_hybrid,
             args=(
                 self.stop,
                 self.rcon,
-                NBT_PY,
-                PLAYERDATA_DIR,
-                USERNAMECACHE,
-                self.stats_interval,
+                lambda: self.cfg.chat.nbt_py,
+                lambda: self.cfg.nbt.playerdata,
+                lambda: self.cfg.nbt.usernamecache,
+                lambda: self.cfg.chat.stats_interval,
                 self._set_stats,
                 self._set_dims,
-                30,
+                lambda: self.cfg.chat.nbt_refresh,
             ),
             daemon=True,
         ).start()
         self.online_players = set()
-        self.query_interval = 3
-        q_host = self.conf.get("host")
-        q_port = self.conf.get("query_port")
         threading.Thread(
             target=poll_query,
-            args=(self.stop, PLAYERDATA_DIR, self.query_interval, self._set_online, q_host, q_port),
+            args=(
+                self.stop,
+                lambda: self.cfg.nbt.playerdata,
+                lambda: self.cfg.chat.query_interval,
+                self._set_online,
+                lambda: self.cfg.chat.query_host or None,
+                lambda: self.cfg.chat.query_port or None,
+            ),
             daemon=True,
         ).start()
+        if self.watcher is not None:
+            self.watcher.subscribe(self._on_config)
 
         self.chat_win = None
         self.cmd_win = None
@@ -107,6 +114,13 @@ class TUI:
         half = halves % 2
         return ("❤" * full) + ("🤍" if half else "")
 
+    def _on_config(self, new, old):
+        self.cfg = new
+        if new.chat.log_path != old.chat.log_path:
+            self.tail.path = new.chat.log_path
+            self.tail.force_refresh()
+        self.needs_render = True
+
     def _set_dims(self, d):
         try:
             m = self.dim_map
@@ -156,45 +170,13 @@ class TUI:
         self.cp = {k: i for i, (k, _) in enumerate(colors.items(), start=1)}
 
     def _reader_loop(self):
-        for line in iter_archives(self.tail.path):
-            if line.startswith("__SEP__ "):
-                date = line.split(" ", 1)[1]
-                self.q.put(("--", "", "--- " + date + " ---", "date_sep"))
-                continue
-            m = parse_chat(line)
-            if m:
-                ts, speaker, msg, kind = m
-                if kind in ("player", "rcon_say"):
-                    self.q.put((ts, speaker, msg, kind))
-                continue
-            j = re.match(r"^\[(\d{2}:\d{2}:\d{2})] \[Server thread/INFO\]: ([A-Za-z0-9_]{1,16}) joined the game", line)
-            l = re.match(r"^\[(\d{2}:\d{2}:\d{2})] \[Server thread/INFO\]: ([A-Za-z0-9_]{1,16}) left the game", line)
-            if j:
-                ts = j.group(1)
-                name = j.group(2)
-                self.q.put((ts, "", f"{name} joined the game", "event_join"))
-            elif l:
-                ts = l.group(1)
-                name = l.group(2)
-                self.q.put((ts, "", f"{name} left the game", "event_leave"))
+        for ev in iter_archive_events(self.tail.path, self.cfg.chat.archive_cache):
+            self.q.put(ev)
 
         for line in self.tail.follow(self.stop):
-            m = parse_chat(line)
-            if m:
-                ts, speaker, msg, kind = m
-                if kind in ("player", "rcon_say"):
-                    self.q.put((ts, speaker, msg, kind))
-                continue
-            j = re.match(r"^\[(\d{2}:\d{2}:\d{2})] \[Server thread/INFO\]: ([A-Za-z0-9_]{1,16}) joined the game", line)
-            l = re.match(r"^\[(\d{2}:\d{2}:\d{2})] \[Server thread/INFO\]: ([A-Za-z0-9_]{1,16}) left the game", line)
-            if j:
-                ts = j.group(1)
-                name = j.group(2)
-                self.q.put((ts, "", f"{name} joined the game", "event_join"))
-            elif l:
-                ts = l.group(1)
-                name = l.group(2)
-                self.q.put((ts, "", f"{name} left the game", "event_leave"))
+            ev = parse_event(line)
+            if ev:
+                self.q.put(ev)
 
     def _resize(self):
         self.stdscr.erase()
@@ -444,12 +426,12 @@ class TUI:
             out = subprocess.check_output(
                 [
                     sys.executable,
-                    NBT_PY,
+                    self.cfg.chat.nbt_py,
                     "--dims-json",
                     "--playerdata",
-                    PLAYERDATA_DIR,
+                    self.cfg.nbt.playerdata,
                     "--usernamecache",
-                    USERNAMECACHE,
+                    self.cfg.nbt.usernamecache,
                 ],
                 stderr=subprocess.DEVNULL,
                 timeout=10,
@@ -463,11 +445,11 @@ class TUI:
                 return {}
             m = {}
             try:
-                for fp in glob.glob(os.path.join(PLAYERDATA_DIR, "*.dat")):
+                for fp in glob.glob(os.path.join(self.cfg.nbt.playerdata, "*.dat")):
                     bn = os.path.basename(fp)
                     uuid = bn.split(".", 1)[0].replace("-", "").lower()
                     try:
-                        with open(USERNAMECACHE, encoding="utf-8") as f:
+                        with open(self.cfg.nbt.usernamecache, encoding="utf-8") as f:
                             names = json.load(f)
                     except Exception:
                         names = {}
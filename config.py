@@ -2,6 +2,8 @@ import hashlib
 import json
 import os
 import re
+import threading
+from dataclasses import dataclass
 from typing import Any
 
 DEFAULT_CONFIG = {
@@ -15,10 +17,46 @@ DEFAULT_CONFIG = {
         "spawn_z": 0,
         "interval": 15.0,
         "max_tps": 1000,
+        "max_catchup": 1,
     },
     "save_file": "auto",
     "save_dir": "saves",
+    "save_format": "json",
+    "tp_log_file": "",
+    "save_policy": {"mode": "every_tp", "every_n": 10, "every_ms": 5000, "fsync": False},
     "nbt": {"playerdata": "/srv/minecraft/world/playerdata", "usernamecache": "/srv/minecraft/usernamecache.json"},
+    "chat": {
+        "log_path": "/srv/minecraft/logs/latest.log",
+        "nbt_py": "/srv/minecraft/rcon/nbt.py",
+        "stats_interval": 1.0,
+        "query_interval": 3.0,
+        "nbt_refresh": 30.0,
+        "query_host": "",
+        "query_port": 0,
+        "archive_cache": "chat_cache",
+    },
+    "throttle": {"enabled": False, "target_mspt": 40.0, "sample_interval": 30.0, "max_interval": 300.0},
+    "auto_resume": {"enabled": True, "grace_s": 5.0, "backoff_max_s": 300.0},
+    "control": {"coalesce_ms": 80, "accelerate": False, "max_accel": 8},
+    "verify": {
+        "enabled": False,
+        "method": "loaded",
+        "radius_blocks": 0,
+        "world_dir": "",
+        "attempts": 2,
+        "settle_s": 10.0,
+        "max_queue": 1000,
+    },
+    "metrics": {
+        "enabled": False,
+        "http_host": "127.0.0.1",
+        "http_port": 9464,
+        "textfile": "",
+        "textfile_interval": 15.0,
+    },
+    "config_watch_interval": 1.0,
+    "jobs_mode": "sequential",
+    "jobs": [],
 }
 
 
@@ -92,9 +130,269 @@ def compute_save_path(conf: dict[str, Any]) -> str:
         sort_keys=True,
     ).encode("utf-8")
     h = hashlib.sha1(payload).hexdigest()[:6]
-    auto_name = f"{player}-{dim}-c{chunks}-sx{sx}-sz{sz}-y{y}-{h}.json"
+    ext = ".spr" if str(conf.get("save_format", "json")) == "binary" else ".json"
+    auto_name = f"{player}-{dim}-c{chunks}-sx{sx}-sz{sz}-y{y}-{h}{ext}"
     if save_file != "auto":
         if save_file.endswith("/") or os.path.isdir(save_file):
             return os.path.join(save_file, auto_name)
         return save_file
     return os.path.join(save_dir, auto_name)
+
+
+def _positive(v) -> bool:
+    return v > 0
+
+
+def _get(d: dict, section: str, key: str, typ, check=None):
+    try:
+        v = d[section][key] if section else d[key]
+        v = typ(v)
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"{section + '.' if section else ''}{key} invalide : {e}") from None
+    if check is not None and not check(v):
+        raise ValueError(f"{section + '.' if section else ''}{key} hors limites : {v}")
+    return v
+
+
+@dataclass(frozen=True, slots=True)
+class RconConfig:
+    host: str
+    port: int
+    password: str
+    timeout: float
+
+
+@dataclass(frozen=True, slots=True)
+class ExplorationConfig:
+    player: str
+    dimension: str
+    y: int
+    chunks: int
+    spawn_x: int
+    spawn_z: int
+    interval: float
+    max_tps: int | None
+    max_catchup: int
+
+    @property
+    def step_blocks(self) -> int:
+        return self.chunks * 16
+
+
+@dataclass(frozen=True, slots=True)
+class NbtConfig:
+    playerdata: str
+    usernamecache: str
+
+
+@dataclass(frozen=True, slots=True)
+class ChatConfig:
+    log_path: str
+    nbt_py: str
+    stats_interval: float
+    query_interval: float
+    nbt_refresh: float
+    query_host: str
+    query_port: int
+    archive_cache: str
+
+
+@dataclass(frozen=True, slots=True)
+class ThrottleConfig:
+    enabled: bool
+    target_mspt: float
+    sample_interval: float
+    max_interval: float
+
+
+@dataclass(frozen=True, slots=True)
+class AutoResumeConfig:
+    enabled: bool
+    grace_s: float
+    backoff_max_s: float
+
+
+@dataclass(frozen=True, slots=True)
+class ControlConfig:
+    coalesce_ms: int
+    accelerate: bool
+    max_accel: int
+
+
+@dataclass(frozen=True, slots=True)
+class VerifyConfig:
+    enabled: bool
+    method: str
+    radius_blocks: int
+    world_dir: str
+    attempts: int
+    settle_s: float
+    max_queue: int
+
+
+@dataclass(frozen=True, slots=True)
+class MetricsConfig:
+    enabled: bool
+    http_host: str
+    http_port: int
+    textfile: str
+    textfile_interval: float
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    rcon: RconConfig
+    exploration: ExplorationConfig
+    nbt: NbtConfig
+    chat: ChatConfig
+    throttle: ThrottleConfig
+    auto_resume: AutoResumeConfig
+    control: ControlConfig
+    verify: VerifyConfig
+    metrics: MetricsConfig
+    save_file: str
+    save_dir: str
+    save_format: str
+    tp_log_file: str
+    watch_interval: float
+
+    @staticmethod
+    def from_dict(d: dict[str, Any]) -> "Config":
+        max_tps = _get(d, "exploration", "max_tps", int, lambda v: v >= -1)
+        return Config(
+            rcon=RconConfig(
+                host=_get(d, "rcon", "host", str),
+                port=_get(d, "rcon", "port", int, lambda v: 0 < v < 65536),
+                password=_get(d, "rcon", "password", str),
+                timeout=_get(d, "rcon", "timeout", float, _positive),
+            ),
+            exploration=ExplorationConfig(
+                player=_get(d, "exploration", "player", str, bool),
+                dimension=_get(d, "exploration", "dimension", str, bool),
+                y=_get(d, "exploration", "y", int),
+                chunks=_get(d, "exploration", "chunks", int, _positive),
+                spawn_x=_get(d, "exploration", "spawn_x", int),
+                spawn_z=_get(d, "exploration", "spawn_z", int),
+                interval=_get(d, "exploration", "interval", float, _positive),
+                max_tps=None if max_tps == -1 else max_tps,
+                max_catchup=_get(d, "exploration", "max_catchup", int, lambda v: v >= 0),
+            ),
+            nbt=NbtConfig(
+                playerdata=_get(d, "nbt", "playerdata", str),
+                usernamecache=_get(d, "nbt", "usernamecache", str),
+            ),
+            chat=ChatConfig(
+                log_path=_get(d, "chat", "log_path", str),
+                nbt_py=_get(d, "chat", "nbt_py", str),
+                stats_interval=_get(d, "chat", "stats_interval", float, _positive),
+                query_interval=_get(d, "chat", "query_interval", float, _positive),
+                nbt_refresh=_get(d, "chat", "nbt_refresh", float, _positive),
+                query_host=_get(d, "chat", "query_host", str),
+                query_port=_get(d, "chat", "query_port", int, lambda v: 0 <= v < 65536),
+                archive_cache=_get(d, "chat", "archive_cache", str),
+            ),
+            throttle=ThrottleConfig(
+                enabled=_get(d, "throttle", "enabled", bool),
+                target_mspt=_get(d, "throttle", "target_mspt", float, _positive),
+                sample_interval=_get(d, "throttle", "sample_interval", float, _positive),
+                max_interval=_get(d, "throttle", "max_interval", float, _positive),
+            ),
+            auto_resume=AutoResumeConfig(
+                enabled=_get(d, "auto_resume", "enabled", bool),
+                grace_s=_get(d, "auto_resume", "grace_s", float, lambda v: v >= 0),
+                backoff_max_s=_get(d, "auto_resume", "backoff_max_s", float, _positive),
+            ),
+            control=ControlConfig(
+                coalesce_ms=_get(d, "control", "coalesce_ms", int, lambda v: v >= 0),
+                accelerate=_get(d, "control", "accelerate", bool),
+                max_accel=_get(d, "control", "max_accel", int, _positive),
+            ),
+            verify=VerifyConfig(
+                enabled=_get(d, "verify", "enabled", bool),
+                method=_get(d, "verify", "method", str, lambda v: v in ("loaded", "region")),
+                radius_blocks=_get(d, "verify", "radius_blocks", int, lambda v: v >= 0),
+                world_dir=_get(d, "verify", "world_dir", str),
+                attempts=_get(d, "verify", "attempts", int, _positive),
+                settle_s=_get(d, "verify", "settle_s", float, lambda v: v >= 0),
+                max_queue=_get(d, "verify", "max_queue", int, _positive),
+            ),
+            metrics=MetricsConfig(
+                enabled=_get(d, "metrics", "enabled", bool),
+                http_host=_get(d, "metrics", "http_host", str),
+                http_port=_get(d, "metrics", "http_port", int, lambda v: 0 <= v < 65536),
+                textfile=_get(d, "metrics", "textfile", str),
+                textfile_interval=_get(d, "metrics", "textfile_interval", float, _positive),
+            ),
+            save_file=_get(d, "", "save_file", str),
+            save_dir=_get(d, "", "save_dir", str),
+            save_format=_get(d, "", "save_format", str, lambda v: v in ("json", "binary")),
+            tp_log_file=_get(d, "", "tp_log_file", str),
+            watch_interval=_get(d, "", "config_watch_interval", float, _positive),
+        )
+
+
+class ConfigWatcher:
+    def __init__(self, path="config.json"):
+        self.path = path
+        self.raw = load_config(path)
+        self.current = Config.from_dict(self.raw)
+        self.error: str | None = None
+        self._subs = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stamp = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def subscribe(self, fn):
+        with self._lock:
+            self._subs.append(fn)
+        return fn
+
+    def unsubscribe(self, fn):
+        with self._lock:
+            if fn in self._subs:
+                self._subs.remove(fn)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def reload(self) -> bool:
+        self._stamp = self._stat()
+        try:
+            raw = load_config(self.path)
+            new = Config.from_dict(raw)
+        except (OSError, ValueError) as e:
+            # Fichier en cours d'écriture ou invalide : on garde la configuration précédente
+            self.error = str(e)
+            return False
+        self.error = None
+        self.raw = raw
+        old, self.current = self.current, new
+        if new == old:
+            return False
+        with self._lock:
+            subs = list(self._subs)
+        for fn in subs:
+            try:
+                fn(new, old)
+            except Exception:
+                pass
+        return True
+
+    def _loop(self):
+        while not self._stop.wait(self.current.watch_interval):
+            if self._stat() != self._stamp:
+                self.reload()
@@ -1,3 +1,4 @@
+import copy
 import time
 
 from rich.box import ROUNDED
@@ -7,6 +8,15 @@ from rich.panel import Panel
 from rich.table import Table
 
 
+def _parse_bool(s: str) -> bool:
+    v = s.strip().lower()
+    if v in ("1", "true", "oui", "on", "o", "y", "yes"):
+        return True
+    if v in ("0", "false", "non", "off", "n", "no"):
+        return False
+    raise ValueError(s)
+
+
 def edit_config(conf, console, read_key_ext) -> dict | None:
     fields = [
         ("RCON host", ("rcon", "host"), "str"),
@@ -21,10 +31,35 @@ def edit_config(conf, console, read_key_ext) -> dict | None:
         ("Spawn (Z)", ("exploration", "spawn_z"), "int"),
         ("Intervalle (s)", ("exploration", "interval"), "float"),
         ("/tp max (-1 = illimité)", ("exploration", "max_tps"), "int"),
+        ("TP en retard rattrapés (max)", ("exploration", "max_catchup"), "int"),
         ("Fichier de sauvegarde", ("save_file",), "str"),
         ("Dossier de sauvegarde", ("save_dir",), "str"),
+        ("Format de sauvegarde (json/binary)", ("save_format",), "str"),
+        ("Journal texte des TP (vide = désactivé)", ("tp_log_file",), "str"),
+        ("Sauvegarde (every_tp/every_n/every_ms/on_exit_only)", ("save_policy", "mode"), "str"),
+        ("Sauvegarde : tous les N TP", ("save_policy", "every_n"), "int"),
+        ("Sauvegarde : toutes les N ms", ("save_policy", "every_ms"), "int"),
+        ("Sauvegarde : fsync", ("save_policy", "fsync"), "bool"),
+        ("Régulation MSPT", ("throttle", "enabled"), "bool"),
+        ("Régulation : MSPT cible (ms)", ("throttle", "target_mspt"), "float"),
+        ("Régulation : mesure toutes les (s)", ("throttle", "sample_interval"), "float"),
+        ("Régulation : intervalle max (s)", ("throttle", "max_interval"), "float"),
+        ("Reprise auto (retour du joueur / RCON)", ("auto_resume", "enabled"), "bool"),
+        ("Contrôle libre : fusion des touches (ms)", ("control", "coalesce_ms"), "int"),
+        ("Contrôle libre : accélération", ("control", "accelerate"), "bool"),
+        ("Vérification de génération", ("verify", "enabled"), "bool"),
+        ("Vérification : méthode (loaded/region)", ("verify", "method"), "str"),
+        ("Vérification : reprises max par TP", ("verify", "attempts"), "int"),
+        ("Métriques OpenMetrics", ("metrics", "enabled"), "bool"),
+        ("Métriques : port HTTP local (0 = aucun)", ("metrics", "http_port"), "int"),
+        ("Métriques : fichier texte (vide = aucun)", ("metrics", "textfile"), "str"),
         ("Dossier playerdata", ("nbt", "playerdata"), "str"),
         ("Fichier usernamecache.json", ("nbt", "usernamecache"), "str"),
+        ("Chat : fichier latest.log", ("chat", "log_path"), "str"),
+        ("Chat : script nbt.py", ("chat", "nbt_py"), "str"),
+        ("Chat : rafraîchissement stats (s)", ("chat", "stats_interval"), "float"),
+        ("Chat : rafraîchissement query (s)", ("chat", "query_interval"), "float"),
+        ("Chat : cache des archives (vide = aucun)", ("chat", "archive_cache"), "str"),
     ]
 
     def edit_value(label, default, typ, password=False):
@@ -54,6 +89,8 @@ def edit_config(conf, console, read_key_ext) -> dict | None:
                             return int(buf)
                         if typ == "float":
                             return float(buf)
+                        if typ == "bool":
+                            return _parse_bool(buf)
                         return buf
                     except Exception:
                         error = True
@@ -88,13 +125,19 @@ def edit_config(conf, console, read_key_ext) -> dict | None:
         "exploration": dict(conf["exploration"]),
         "save_file": conf.get("save_file", "auto"),
         "save_dir": conf.get("save_dir", "saves"),
+        "save_format": conf.get("save_format", "json"),
         "nbt": dict(
             conf.get(
                 "nbt",
                 {"playerdata": "/srv/minecraft/world/playerdata", "usernamecache": "/srv/minecraft/usernamecache.json"},
             )
         ),
+        "save_policy": dict(
+            conf.get("save_policy", {"mode": "every_tp", "every_n": 10, "every_ms": 5000, "fsync": False})
+        ),
     }
+    for k, v in conf.items():
+        conf2.setdefault(k, copy.deepcopy(v))
     sel = 0
     editing = False
     edit_buf = ""
@@ -154,6 +197,8 @@ def edit_config(conf, console, read_key_ext) -> dict | None:
                             val = int(edit_buf)
                         elif edit_typ == "float":
                             val = float(edit_buf)
+                        elif edit_typ == "bool":
+                            val = _parse_bool(edit_buf)
                         else:
                             val = edit_buf
                         setv(conf2, edit_path, val)
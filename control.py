@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
-import glob
 import os
-import re
+import queue
 import select
 import shutil
 import sys
 import termios
+import threading
 import time
 import tty
 from collections import deque
@@ -20,6 +20,10 @@ from rich.table import Table
 from rich.text import Text
 
 from config import compute_save_path
+from minimap import Minimap
+from save_index import SaveIndex, save_key_from_conf
+from scheduler import TELEPORTED_RE
+from waypoints import load_waypoints, save_waypoints, tour_steps, waypoints_path
 
 
 def _read_key(timeout=0.1) -> str | None:
@@ -60,36 +64,72 @@ class RawInput:
             termios.tcsetattr(self.fd, termios.TCSADRAIN, self.old)
 
 
-def _dim_short(dim: str) -> str:
-    mapping = {"minecraft:overworld": "ovw", "minecraft:the_nether": "net", "minecraft:the_end": "end"}
-    if dim in mapping:
-        return mapping[dim]
-    dim = dim.replace("minecraft:", "")
-    return "".join(c for c in dim if c.isalnum())[:8] or "dim"
+def _find_latest_save(conf: dict) -> str | None:
+    index = SaveIndex(str(conf.get("save_dir", "saves"))).load()
+    path = index.lookup(save_key_from_conf(conf))
+    if path:
+        return path
+    path = compute_save_path(conf)
+    return path if os.path.isfile(path) else None
+
+
+def _saves_table(entries, sel):
+    t = Table(box=ROUNDED, show_lines=False)
+    for col, just in (
+        ("", "left"),
+        ("Joueur", "left"),
+        ("Dimension", "left"),
+        ("Chunks", "right"),
+        ("Spawn (X,Z)", "right"),
+        ("Y", "right"),
+        ("TP", "right"),
+        ("Progression", "right"),
+        ("Modifiée", "right"),
+    ):
+        t.add_column(col, justify=just, no_wrap=True)
+    for i, ent in enumerate(entries):
+        step = int(ent.get("step", 0))
+        mx = ent.get("max_tps")
+        prog = f"{100.0 * step / mx:.1f}%" if mx not in (None, -1, 0) else "—"
+        style = "green" if i == sel else "white"
+        t.add_row(
+            "➤" if i == sel else "",
+            str(ent.get("player", "")),
+            str(ent.get("dimension", "")),
+            str(ent.get("chunks", "")),
+            f"{ent.get('spawn_x', 0)}, {ent.get('spawn_z', 0)}",
+            str(ent.get("y", "")),
+            str(step),
+            prog,
+            time.strftime("%Y-%m-%d %H:%M", time.localtime(float(ent.get("mtime", 0)))),
+            style=style,
+        )
+    foot = Text.from_markup("[grey50]↑/↓ puis Entrée pour charger, Esc pour annuler[/grey50]")
+    return Panel(Group(t, foot), title="Sauvegardes", box=ROUNDED)
 
 
-def _find_latest_save(conf: dict) -> str | None:
-    e = conf["exploration"]
-    sd = conf.get("save_dir", "saves")
-    player = e["player"]
-    dim = _dim_short(e["dimension"])
-    chunks = int(e["chunks"])
-    sx = int(e["spawn_x"])
-    sz = int(e["spawn_z"])
-    y = int(e["y"])
-    pattern = os.path.join(sd, f"{player}-{dim}-c{chunks}-sx{sx}-sz{sz}-y{y}-*.json")
-    files = glob.glob(pattern)
-    if not files:
-        path = compute_save_path(conf)
-        return path if os.path.isfile(path) else None
-    files.sort(key=lambda p: os.path.getmtime(p), reverse=True)
-    return files[0]
-
-
-_TELEPORTED_RE = re.compile(
-    r"^Teleported\s+.+?\s+to\s+([+-]?\d+(?:\.\d+)?),\s*([+-]?\d+(?:\.\d+)?),\s*([+-]?\d+(?:\.\d+)?)\s*$",
-    re.IGNORECASE,
-)
+def _pick_save(conf: dict) -> str | None:
+    entries = SaveIndex(str(conf.get("save_dir", "saves"))).load().list()
+    if not entries:
+        return None
+    sel = 0
+    with Live(_saves_table(entries, sel), auto_refresh=False, screen=False) as live:
+        while True:
+            k = _read_key(timeout=0.5)
+            if not k:
+                continue
+            if k == "UP":
+                sel = (sel - 1) % len(entries)
+            elif k == "DOWN":
+                sel = (sel + 1) % len(entries)
+            elif k in ("\r", "\n"):
+                return entries[sel]["path"]
+            elif k == "ESC":
+                return None
+            else:
+                continue
+            live.update(_saves_table(entries, sel))
+            live.refresh()
 
 
 def _fmt_num(n):
@@ -102,7 +142,8 @@ def _fmt_num(n):
 
 
 LEFT_MIN_WIDTH = 44
-_left_width = LEFT_MIN_WIDTH
+LOG_VISIBLE = 20
+LOG_HISTORY = 500
 
 
 def _fmt_ts() -> str:
@@ -140,7 +181,7 @@ def _coords_right_err(x, y, z):
 def _build_right(resp, player, x, y, z):
     if resp and resp.startswith("[DRY-RUN]"):
         return f"[white]Teleported {player} to[/white] {_coords_right_err(x,y,z)} [yellow](simulation)[/yellow]"
-    m = _TELEPORTED_RE.match((resp or "").strip())
+    m = TELEPORTED_RE.match((resp or "").strip())
     if m:
         rx, ry, rz = _fmt_num(m.group(1)), _fmt_num(m.group(2)), _fmt_num(m.group(3))
         return f"[white]Teleported {player} to[/white] {_coords_right_ok(rx,ry,rz)}"
@@ -170,36 +211,46 @@ def _pad_trunc(txt: Text, width: int) -> Text:
     return txt
 
 
-def _log_panel(rows, width):
-    global _left_width
-    left_w_measured = 0
-    left_texts = []
-    right_texts = []
-    for left_markup, right_markup in rows:
+# Lignes analysées une seule fois à l'ajout ; le bloc affiché n'est reconstruit que si une ligne arrive
+# ou si la largeur change, et seules les LOG_VISIBLE dernières lignes sont dessinées.
+class _LogPanel:
+    def __init__(self, history: int = LOG_HISTORY, visible: int = LOG_VISIBLE):
+        self.rows: deque = deque(maxlen=history)
+        self.visible = visible
+        self.left_area = LEFT_MIN_WIDTH
+        self._width = None
+        self._block = None
+
+    def append(self, left_markup: str, right_markup: str) -> None:
         lt = Text.from_markup(left_markup)
         lt.no_wrap = True
         rt = Text.from_markup(right_markup)
         rt.no_wrap = True
-        left_texts.append(lt)
-        right_texts.append(rt)
-        left_w_measured = max(left_w_measured, lt.cell_len)
-    left_area = max(LEFT_MIN_WIDTH, left_w_measured, _left_width)
-    cols_total = width
-    right_area = max(20, cols_total - left_area - 7)
-    _left_width = left_area
-    lines = [_top_border("Historique TPs", width)]
-    for lt, rt in zip(left_texts, right_texts, strict=False):
-        lt = _pad_trunc(lt, left_area)
-        rt = _pad_trunc(rt, right_area)
-        line = Text()
-        line.append("│ ")
-        line += lt
-        line.append(" │ ")
-        line += rt
-        line.append(" │")
-        lines.append(line)
-    lines.append(_bottom_border_split(width, left_area, right_area))
-    return Group(*lines)
+        # La colonne de gauche ne rétrécit jamais : les lignes déjà affichées ne bougent pas
+        self.left_area = max(self.left_area, lt.cell_len)
+        self.rows.append((lt, rt))
+        self._block = None
+
+    def render(self, width: int) -> Group:
+        if self._block is not None and width == self._width:
+            return self._block
+        left_area = self.left_area
+        right_area = max(20, width - left_area - 7)
+        lines = [_top_border("Historique TPs", width)]
+        start = max(0, len(self.rows) - self.visible)
+        for idx in range(start, len(self.rows)):
+            lt, rt = self.rows[idx]
+            line = Text()
+            line.append("│ ")
+            line += _pad_trunc(lt.copy(), left_area)
+            line.append(" │ ")
+            line += _pad_trunc(rt.copy(), right_area)
+            line.append(" │")
+            lines.append(line)
+        lines.append(_bottom_border_split(width, left_area, right_area))
+        self._width = width
+        self._block = Group(*lines)
+        return self._block
 
 
 def _dim_mark_and_player_style(dim: str):
@@ -249,10 +300,24 @@ def _controls_block():
         (" : ", "dim"),
         ("i", "khaki1"),
     )
-    return [l1, l2]
+    l3 = Text.assemble(
+        ("Point de passage", "bold cyan"),
+        (" : ", "dim"),
+        ("W/X", "khaki1"),
+        (" (+/−)", "dim"),
+        (" | ", "dim"),
+        ("Tournée", "bold cyan"),
+        (" : ", "dim"),
+        ("T", "khaki1"),
+        (" | ", "dim"),
+        ("Pause", "bold cyan"),
+        (" : ", "dim"),
+        ("P", "khaki1"),
+    )
+    return [l1, l2, l3]
 
 
-def _ui(player, dim, x, y, z, chunks, tp_count, width):
+def _ui(player, dim, x, y, z, chunks, tp_count, width, server=None, rows=(), minimap=None):
     dim_markup, p_color = _dim_mark_and_player_style(dim)
     info = Table.grid(expand=True)
     info.add_column(justify="left", ratio=1, no_wrap=True)
@@ -260,11 +325,26 @@ def _ui(player, dim, x, y, z, chunks, tp_count, width):
     info.add_row("Joueur", f"[{p_color}]{player}[/{p_color}]")
     info.add_row("Dimension", dim_markup)
     info.add_row("Position (X,Y,Z)", f"{x}, {y}, {z}")
+    if server is not None:
+        info.add_row("Position serveur", server)
     info.add_row("Saut (Chunks -> Blocs)", f"{chunks} -> {chunks*16}")
     info.add_row("Nombre de /tp", f"[gold1]{tp_count}[/gold1]")
-    info_panel = Panel(info, title="Contrôle libre", box=ROUNDED, width=width)
-    ctl = _controls_block()
-    controls_panel = Panel(Group(ctl[0], ctl[1]), title="Contrôles", box=ROUNDED, width=width)
+    for label, value in rows:
+        info.add_row(label, value)
+    if minimap is None:
+        info_panel = Panel(info, title="Contrôle libre", box=ROUNDED, width=width)
+    else:
+        map_w = max(30, int(width * 0.4))
+        n = info.row_count
+        # render() choisit le zoom : l'échelle du titre se lit après
+        text = minimap.render(x, z, map_w - 4, n)
+        title = f"Carte (1 point = {minimap.scale} blocs)"
+        info_panel = Table.grid()
+        info_panel.add_row(
+            Panel(info, title="Contrôle libre", box=ROUNDED, width=width - map_w),
+            Panel(text, title=title, box=ROUNDED, width=map_w, height=n + 2),
+        )
+    controls_panel = Panel(Group(*_controls_block()), title="Contrôles", box=ROUNDED, width=width)
     return Group(info_panel, controls_panel)
 
 
@@ -328,14 +408,17 @@ def _read_dim_key(timeout=0.25):
 
 
 def _prompt_dimension(live, width, current_dim: str) -> str | None:
+    hint = "Saisir une dimension (Entrée ou Esc pour choisir la dimension actuelle / Annuler) :"
+    return _prompt_text(live, width, "Changer de dimension", hint)
+
+
+def _prompt_text(live, width, title: str, hint: str) -> str | None:
     buf = []
     while True:
         blink = "█" if int(time.time() * 2) % 2 == 0 else " "
-        line1 = Text.assemble(
-            ("Saisir une dimension (Entrée ou Esc pour choisir la dimension actuelle / Annuler) :", "dim")
-        )
+        line1 = Text.assemble((hint, "dim"))
         line2 = Text.assemble(("> ", "bold"), ("".join(buf), "white"), (blink, "white"))
-        panel = Panel(Group(line1, line2), title="Changer de dimension", box=ROUNDED, width=max(60, min(width, 100)))
+        panel = Panel(Group(line1, line2), title=title, box=ROUNDED, width=max(60, min(width, 100)))
         live.update(Group(panel))
         live.refresh()
         k = _read_dim_key(timeout=0.25)
@@ -376,36 +459,155 @@ def _coords_right_err(x, y, z):
     return f"[magenta]X=[/magenta][red]{sx.ljust(_wxR)}[/red]  [magenta]Y=[/magenta][red]{sy.ljust(_wyR)}[/red] [magenta]Z=[/magenta][red]{sz.ljust(_wzR)}[/red]"
 
 
+# Attente maximale du dernier TP à la sortie : un RCON bloqué ne doit pas figer le retour au menu
+TP_JOIN_TIMEOUT_S = 10.0
+
+
+# Les TP partent d'un thread dédié : une seule commande en vol, et seule la dernière cible demandée
+# pendant ce temps est envoyée ensuite (les cibles intermédiaires sont déjà dépassées).
+class _TPWorker(threading.Thread):
+    def __init__(self, rcon, player: str):
+        super().__init__(name="free-control-tp", daemon=True)
+        self.rcon = rcon
+        self.player = player
+        self.results: queue.Queue = queue.Queue()
+        self._cond = threading.Condition()
+        self._next = None
+        self._stopping = False
+
+    def submit(self, target):
+        with self._cond:
+            self._next = target
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+
+    def run(self):
+        while True:
+            with self._cond:
+                while self._next is None and not self._stopping:
+                    self._cond.wait()
+                if self._next is None:
+                    return
+                target, self._next = self._next, None
+            tdim, tx, ty, tz = target
+            try:
+                resp = self.rcon.cmd(f"execute in {tdim} run tp {self.player} {tx} {ty} {tz}")
+            except Exception as e:
+                resp = f"ERREUR RCON : {e}"
+            self.results.put((target, resp))
+
+
+# Lecture d'une tournée à cadence fixe (échéances sur l'horloge monotone, comme run_loop). Sans
+# rattrapage : un pas en retard part dès que le précédent est confirmé, aucun n'est sauté.
+class _Tour:
+    def __init__(self, steps: list, pos: int, interval_s: float):
+        self.steps = steps
+        self.pos = pos if 0 <= pos < len(steps) else 0
+        self.interval_s = interval_s
+        self.paused = False
+        self.next_due = time.monotonic()
+
+    def done(self) -> bool:
+        return self.pos >= len(self.steps)
+
+    def due(self, now: float) -> bool:
+        return not self.paused and not self.done() and now >= self.next_due
+
+    def advance(self, now: float):
+        step = self.steps[self.pos]
+        self.pos += 1
+        self.next_due += self.interval_s
+        if self.next_due < now:
+            self.next_due = now + self.interval_s
+        return step
+
+    def toggle_pause(self):
+        self.paused = not self.paused
+        if not self.paused:
+            self.next_due = time.monotonic()
+
+    def describe(self) -> str:
+        s = f"{self.pos} / {len(self.steps)}"
+        return s + " [yellow](en pause)[/yellow]" if self.paused else s
+
+
+def _matches(target, m) -> bool:
+    # Le serveur centre X et Z sur le bloc (+0.5) : on tolère un demi-bloc
+    _, tx, ty, tz = target
+    try:
+        got = (float(m.group(1)), float(m.group(2)), float(m.group(3)))
+    except ValueError:
+        return False
+    return all(abs(a - float(b)) <= 0.5 for a, b in zip(got, (tx, ty, tz), strict=True))
+
+
+# (dx, dy, dz) par touche : un pas de chunks horizontalement, 16 blocs en hauteur
+_MOVES = {
+    "RIGHT": (1, 0, 0),
+    "d": (1, 0, 0),
+    "LEFT": (-1, 0, 0),
+    "q": (-1, 0, 0),
+    "UP": (0, 0, -1),
+    "z": (0, 0, -1),
+    "DOWN": (0, 0, 1),
+    "s": (0, 0, 1),
+    "a": (0, 1, 0),
+    "e": (0, -1, 0),
+}
+
+# Appuis rapprochés dans la même direction (touche maintenue) : le pas double tous les ACCEL_EVERY appuis
+ACCEL_GAP_S = 0.25
+ACCEL_EVERY = 4
+
+
+class _KeyRepeat:
+    def __init__(self, enabled: bool, max_mult: int):
+        self.enabled = enabled
+        self.max_mult = max_mult
+        self.move = None
+        self.run = 0
+        self.last = 0.0
+
+    def press(self, move) -> int:
+        now = time.monotonic()
+        if move == self.move and now - self.last <= ACCEL_GAP_S:
+            self.run += 1
+        else:
+            self.move = move
+            self.run = 0
+        self.last = now
+        if not self.enabled:
+            return 1
+        return min(self.max_mult, 2 ** (self.run // ACCEL_EVERY))
+
+    def reset(self):
+        self.move = None
+        self.run = 0
+
+
 def _load_from_current_player(conf: dict):
     e = conf.get("exploration", {})
     player = e.get("player", "Yakonche")
-    usernamecache = conf.get("usernamecache", "/srv/minecraft/usernamecache.json")
-    playerdata_dir = conf.get("playerdata_dir", "/srv/minecraft/world/playerdata")
+    n = conf.get("nbt", {})
+    usernamecache = n.get("usernamecache", "/srv/minecraft/usernamecache.json")
+    playerdata_dir = n.get("playerdata", "/srv/minecraft/world/playerdata")
     try:
         import nbt as nbtmod
     except Exception as ex:
         raise RuntimeError(f"import nbt.py impossible : {ex}")
-    names = nbtmod.load_usernames(usernamecache)
-    uuid = None
-    for k, v in names.items():
-        if v == player:
-            uuid = k
-            break
+    uuid = nbtmod.username_index(usernamecache).uuid_for(player)
     if not uuid:
         raise RuntimeError(f"UUID introuvable pour {player} dans {usernamecache}")
-    fp = os.path.join(playerdata_dir, f"{uuid}.dat")
-    if not os.path.isfile(fp):
-        raise RuntimeError(f"playerdata introuvable: {fp}")
-    pdata = nbtmod.read_file(fp)
-    dim = _normalize_dim(str(pdata.get("Dimension", "minecraft:overworld")))
-    pos = pdata.get("Pos", [0, 192, 0])
-    try:
-        if hasattr(pos, "tolist"):
-            pos = pos.tolist()
-        x, y, z = float(pos[0]), float(pos[1]), float(pos[2])
-    except Exception:
-        x, y, z = 0.0, 192.0, 0.0
-    return dim, x, y, z
+    fp = nbtmod.player_file(playerdata_dir, uuid)
+    if fp is None:
+        raise RuntimeError(f"playerdata introuvable: {os.path.join(playerdata_dir, uuid + '.dat')}")
+    dim, pos = nbtmod.read_pos_dim(fp)
+    x, y, z = pos if pos is not None else (0.0, 192.0, 0.0)
+    return _normalize_dim(dim or "minecraft:overworld"), x, y, z
 
 
 def run_free_control(conf: dict, rcon) -> None:
@@ -417,12 +619,17 @@ def run_free_control(conf: dict, rcon) -> None:
     y = int(e.get("y", 192))
     step_chunks = int(e.get("chunks", 32))
     x, z = x0, z0
+    c = conf.get("control", {})
+    coalesce_s = max(0.0, float(c.get("coalesce_ms", 80))) / 1000.0
+    accelerate = bool(c.get("accelerate", False))
+    max_accel = max(1, int(c.get("max_accel", 8)))
 
     print("\nContrôle libre — choisissez le point de départ :")
     print("1) Spawn")
     print("2) Charger depuis la sauvegarde")
     print("3) Charger depuis la position actuelle du joueur")
-    print("4) Quitter (Esc)\n")
+    print("4) Quitter (Esc)")
+    print("5) Choisir une sauvegarde dans le catalogue\n")
 
     choice = None
     with RawInput(sys.stdin):
@@ -430,19 +637,21 @@ def run_free_control(conf: dict, rcon) -> None:
             k = _read_key(timeout=0.5)
             if not k:
                 continue
-            if k in "1234":
+            if k in "12345":
                 choice = k
                 break
             if k == "ESC":
                 choice = "4"
                 break
 
-    if choice == "2":
+    save_path = None
+    if choice in "25":
         try:
             from state import SaveManager
 
-            path = _find_latest_save(conf)
+            path = _find_latest_save(conf) if choice == "2" else _pick_save(conf)
             if path:
+                save_path = path
                 st = SaveManager(path).load()
                 dim = st.dimension or dim
                 x = st.current_x if st.current_x is not None else st.spawn_x
@@ -463,122 +672,225 @@ def run_free_control(conf: dict, rcon) -> None:
 
     if choice == "4":
         return
+    wp_path = waypoints_path(save_path or _find_latest_save(conf) or compute_save_path(conf))
+    wps, tour_pos = load_waypoints(wp_path)
+    tour = None
+    interval_s = max(0.0, float(e.get("interval", 15.0)))
 
     cols = shutil.get_terminal_size((120, 40)).columns
     width = min(max(110, int(cols * 0.95)), max(120, cols - 2), 240)
     tp_count = 0
     last_sent = None
-    logs = deque(maxlen=20)
+    pending = None
+    server = "[grey50]—[/grey50]"
+    logs = _LogPanel()
+    # Une carte par dimension, sur la grille du pas de départ
+    maps: dict[str, Minimap] = {}
+
+    def minimap_for(d: str) -> Minimap:
+        if d not in maps:
+            maps[d] = Minimap(x0, z0, step_chunks * 16)
+        return maps[d]
+
+    worker = _TPWorker(rcon, player)
+    worker.start()
 
     def send_tp(tx, ty, tz, tdim):
-        nonlocal last_sent, tp_count
-        tdim2 = _normalize_dim(tdim)
-        target = (tdim2, tx, ty, tz)
+        nonlocal last_sent, pending, server
+        target = (_normalize_dim(tdim), tx, ty, tz)
         if target == last_sent:
             return False
-        try:
-            resp = rcon.cmd(f"execute in {tdim2} run tp {player} {tx} {ty} {tz}")
-        except Exception as e:
-            resp = f"ERREUR RCON : {e}"
+        # Affichage optimiste : la cible est montrée tout de suite, la réponse du serveur la confirmera
+        worker.submit(target)
+        last_sent = pending = target
+        server = "[yellow]TP en cours…[/yellow]"
+        return True
+
+    def on_result(target, resp):
+        nonlocal tp_count, last_sent, pending, server
+        tdim, tx, ty, tz = target
+        if not (resp or "").startswith("ERREUR RCON"):
+            minimap_for(tdim).visit(tx, tz)
         ts = _fmt_ts()
         left = f"{ts} [bold cyan]TP {tp_count}[/bold cyan] -> {_coords_left(tx,ty,tz)}"
+        tp_count += 1
+        done = target == pending
+        if done:
+            pending = None
         if resp and resp.strip():
-            m = _TELEPORTED_RE.match(resp.strip())
+            m = TELEPORTED_RE.match(resp.strip())
             if m:
                 rx, ry, rz = _fmt_num(m.group(1)), _fmt_num(m.group(2)), _fmt_num(m.group(3))
-                right = f"[white]Teleported {player} to[/white] {_coords_right_ok(rx,ry,rz)}"
+                if _matches(target, m):
+                    right = f"[white]Teleported {player} to[/white] {_coords_right_ok(rx,ry,rz)}"
+                    status = f"[green]{rx}, {ry}, {rz}[/green]"
+                else:
+                    right = f"[white]Teleported {player} to[/white] {_coords_right_err(rx,ry,rz)}"
+                    right += " [magenta](écart)[/magenta]"
+                    status = f"[red]{rx}, {ry}, {rz}[/red] [magenta](écart)[/magenta]"
             else:
                 right = f"[white]Teleported {player} to[/white] {_coords_right_err(tx,ty,tz)}"
-                logs.append((left, right))
-                logs.append(("", f"[red]{resp}[/red]"))
-                last_sent = target
-                return True
+                logs.append(left, right)
+                logs.append("", f"[red]{resp}[/red]")
+                # Cible non atteinte : la redemander doit renvoyer le TP
+                if target == last_sent:
+                    last_sent = None
+                if done:
+                    server = "[red]échec[/red]"
+                return
         else:
             right = f"[white]Teleported {player} to[/white] {_coords_right_ok(tx,ty,tz)}"
-        logs.append((left, right))
-        last_sent = target
-        return True
+            status = f"{tx}, {ty}, {tz}"
+        logs.append(left, right)
+        if done:
+            server = status
 
-    with Live(auto_refresh=False, screen=False) as live, RawInput(sys.stdin):
-        dirty = True
-        send_tp(x, y, z, dim)
-        dirty = True
-        last_cols = cols
-        while True:
-            if dirty:
-                log_block = _log_panel(list(logs), width)
-                ctrl_panel = _ui(player, dim, x, y, z, step_chunks, tp_count, max(90, min(120, int(width * 0.8))))
-                live.update(Group(log_block, Align.center(ctrl_panel)))
-                live.refresh()
-                dirty = False
-
-            start = time.time()
-            moved = False
-            while time.time() - start < 0.8:
-                k = _read_key(timeout=0.1)
+    def store_waypoints():
+        try:
+            save_waypoints(wp_path, wps, tour.pos if tour is not None else tour_pos)
+        except OSError as ex:
+            logs.append("", f"[red]Points de passage non enregistrés : {ex}[/red]")
+
+    try:
+        with Live(auto_refresh=False, screen=False) as live, RawInput(sys.stdin):
+            dirty = True
+            send_tp(x, y, z, dim)
+            last_cols = cols
+            flush_at = None
+            repeat = _KeyRepeat(accelerate, max_accel)
+            while True:
+                while True:
+                    try:
+                        target, resp = worker.results.get_nowait()
+                    except queue.Empty:
+                        break
+                    on_result(target, resp)
+                    dirty = True
+                # Un pas de tournée ne part qu'une fois le précédent confirmé : aucun couloir n'est sauté
+                if tour is not None and pending is None and tour.due(time.monotonic()):
+                    dim, x, y, z = tour.advance(time.monotonic())
+                    send_tp(x, y, z, dim)
+                    if tour.done():
+                        logs.append("", "[green]Tournée terminée[/green]")
+                        tour, tour_pos = None, 0
+                        for mm in maps.values():
+                            mm.set_plan(())
+                    store_waypoints()
+                    dirty = True
+                # Tant que des touches attendent, inutile de dessiner une position déjà dépassée
+                if dirty and not select.select([sys.stdin], [], [], 0)[0]:
+                    log_block = logs.render(width)
+                    ui_width = max(90, min(120, int(width * 0.8)))
+                    rows = [("Points de passage", str(len(wps)))]
+                    if tour is not None:
+                        rows.append(("Tournée", tour.describe()))
+                    mm = minimap_for(_normalize_dim(dim))
+                    ctrl_panel = _ui(player, dim, x, y, z, step_chunks, tp_count, ui_width, server, rows, mm)
+                    live.update(Group(log_block, Align.center(ctrl_panel)))
+                    live.refresh()
+                    dirty = False
+
+                timeout = 0.1 if flush_at is None else max(0.0, flush_at - time.monotonic())
+                if tour is not None and not tour.paused and pending is None:
+                    timeout = min(timeout, max(0.0, tour.next_due - time.monotonic()))
+                k = _read_key(timeout=timeout)
                 if not k:
+                    if flush_at is not None and time.monotonic() >= flush_at:
+                        # Fin de la fenêtre : un seul TP vers la cible finale
+                        flush_at = None
+                        if send_tp(x, y, z, dim):
+                            dirty = True
+                        continue
                     new_cols = shutil.get_terminal_size((120, 40)).columns
                     if new_cols != last_cols:
                         last_cols = new_cols
                         width = min(max(110, int(new_cols * 0.95)), max(120, new_cols - 2), 240)
                         dirty = True
                     continue
-                if k == "RIGHT" or k.lower() == "d":
-                    x += step_chunks * 16
-                    tp_count += 1
-                    moved = True
-                    break
-                if k == "LEFT" or k.lower() == "q":
-                    x -= step_chunks * 16
-                    tp_count += 1
-                    moved = True
-                    break
-                if k == "UP" or k.lower() == "z":
-                    z -= step_chunks * 16
-                    tp_count += 1
-                    moved = True
-                    break
-                if k == "DOWN" or k.lower() == "s":
-                    z += step_chunks * 16
-                    tp_count += 1
-                    moved = True
-                    break
-                if k.lower() == "a":
-                    y += 16
-                    tp_count += 1
-                    moved = True
-                    break
-                if k.lower() == "e":
-                    y -= 16
-                    tp_count += 1
-                    moved = True
-                    break
+                move = _MOVES.get(k if len(k) > 1 else k.lower())
+                if move is not None:
+                    if tour is not None and not tour.paused:
+                        # Reprise en main : la tournée attend
+                        tour.toggle_pause()
+                    mult = repeat.press(move)
+                    dx, dy, dz = move
+                    x += dx * step_chunks * 16 * mult
+                    z += dz * step_chunks * 16 * mult
+                    y += dy * 16 * mult
+                    # Les touches lues pendant la fenêtre (ou restées en tampon pendant un TP lent) fusionnent
+                    if flush_at is None:
+                        flush_at = time.monotonic() + coalesce_s
+                    dirty = True
+                    continue
+                repeat.reset()
                 if k == "+":
                     step_chunks = max(1, step_chunks * 2)
                     dirty = True
-                    break
-                if k == "-":
+                elif k == "-":
                     step_chunks = max(1, step_chunks // 2 or 1)
                     dirty = True
-                    break
-                if k.lower() == "r":
+                elif k.lower() == "r":
                     x, z = x0, z0
-                    moved = True
-                    break
-                if k.lower() == "i":
+                    flush_at = None
+                    if send_tp(x, y, z, dim):
+                        dirty = True
+                elif k.lower() == "i":
                     panel = Panel(Text(""), title="Changer de dimension", box=ROUNDED, width=max(60, min(width, 100)))
                     live.update(Group(panel))
                     live.refresh()
                     new_dim = _prompt_dimension(live, width, dim)
                     if new_dim:
                         dim = _normalize_dim(new_dim)
-                        tp_count += 1
-                        if send_tp(x, y, z, dim):
-                            dirty = True
+                        flush_at = None
+                        send_tp(x, y, z, dim)
                     dirty = True
-                    break
-                if k == "ESC":
-                    return
-            if moved:
-                if send_tp(x, y, z, dim):
+                elif k.lower() == "w":
+                    name = _prompt_text(live, width, "Point de passage", "Nom du point de passage (Esc pour annuler) :")
+                    if name:
+                        wps.append({"name": name, "dimension": dim, "x": int(x), "y": int(y), "z": int(z)})
+                        tour_pos = 0
+                        store_waypoints()
+                        logs.append("", f"[green]Point de passage « {name} » : {int(x)}, {int(y)}, {int(z)}[/green]")
                     dirty = True
+                elif k.lower() == "x" and tour is None:
+                    if wps:
+                        w = wps.pop()
+                        tour_pos = 0
+                        store_waypoints()
+                        logs.append("", f"[yellow]Point de passage « {w['name']} » retiré[/yellow]")
+                        dirty = True
+                elif k.lower() == "t":
+                    if tour is not None:
+                        tour_pos = tour.pos
+                        tour = None
+                        store_waypoints()
+                        for mm in maps.values():
+                            mm.set_plan(())
+                        logs.append("", f"[yellow]Tournée arrêtée au pas {tour_pos}[/yellow]")
+                    elif len(wps) < 2:
+                        logs.append("", "[yellow]Il faut au moins deux points de passage pour une tournée[/yellow]")
+                    else:
+                        flush_at = None
+                        tour = _Tour(tour_steps(wps, step_chunks * 16), tour_pos, interval_s)
+                        # Le reste de la tournée apparaît en plan sur la carte de chaque dimension traversée
+                        for d in {st[0] for st in tour.steps}:
+                            minimap_for(d).set_plan([(sx, sz) for sd, sx, _, sz in tour.steps[tour.pos :] if sd == d])
+                        logs.append("", f"[green]Tournée : {len(tour.steps)} pas, reprise au pas {tour.pos}[/green]")
+                    dirty = True
+                elif k.lower() == "p" and tour is not None:
+                    tour.toggle_pause()
+                    dirty = True
+                elif k == "ESC":
+                    if flush_at is not None:
+                        send_tp(x, y, z, dim)
+                    if tour is not None:
+                        tour_pos = tour.pos
+                        tour = None
+                        store_waypoints()
+                    break
+    finally:
+        # Le dernier TP demandé part quand même ; le RCON est rendu libre à l'appelant
+        worker.stop()
+        worker.join(TP_JOIN_TIMEOUT_S)
+        if worker.is_alive():
+            print("[yellow]Dernier TP sans réponse du serveur : abandonné.[/yellow]")
@@ -0,0 +1,33 @@
+import json
+import sys
+import threading
+import time
+
+
+class EventLog:
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.f = open(path, "a", encoding="utf-8", buffering=1) if path else sys.stdout
+        self._lock = threading.Lock()
+
+    def emit(self, event: str, **fields):
+        rec = {"ts": round(time.time(), 3), "event": event, **fields}
+        line = json.dumps(rec, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self.f.write(line + "\n")
+            self.f.flush()
+
+    def tp(self, ev):
+        self.emit("tp", step=ev.step, x=ev.x, y=ev.y, z=ev.z, latency_ms=round(ev.latency * 1000.0, 1))
+        self.emit("response", step=ev.step, text=ev.resp)
+        # Les pauses, y compris celles décidées hors TP, sont journalisées par l'abonné de run_headless
+        if ev.issue and ev.resp.startswith("ERREUR RCON"):
+            self.emit("error", step=ev.step, reason=ev.issue)
+
+    def close(self):
+        if self.f is not sys.stdout:
+            try:
+                self.f.close()
+            except OSError:
+                pass
+
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+import argparse
+import math
+import os
+import struct
+import sys
+
+from scheduler import REASON_OFFLINE, REASON_RCON, TELEPORTED_RE, _looks_offline_or_error
+
+# Enregistrement fixe de 56 octets, little-endian, lisible avec numpy.fromfile(path, dtype=history_dtype())
+RECORD = struct.Struct("<IdiiidddfB3x")
+
+ERR_OK = 0
+ERR_DRY_RUN = 1
+ERR_OFFLINE = 2
+ERR_RCON = 3
+ERR_UNPARSED = 4
+ERR_NAMES = {
+    ERR_OK: "ok",
+    ERR_DRY_RUN: "simulation",
+    ERR_OFFLINE: "joueur introuvable",
+    ERR_RCON: "RCON indisponible",
+    ERR_UNPARSED: "réponse inattendue",
+}
+
+
+def history_path(save_path: str) -> str:
+    return save_path + ".history"
+
+
+def history_dtype():
+    import numpy as np
+
+    return np.dtype(
+        [
+            ("step", "<u4"),
+            ("t", "<f8"),
+            ("x", "<i4"),
+            ("y", "<i4"),
+            ("z", "<i4"),
+            ("rx", "<f8"),
+            ("ry", "<f8"),
+            ("rz", "<f8"),
+            ("latency", "<f4"),
+            ("err", "u1"),
+            ("pad", "V3"),
+        ]
+    )
+
+
+def classify_response(resp: str) -> tuple[int, float, float, float]:
+    nan = math.nan
+    r = (resp or "").strip()
+    if r.startswith("[DRY-RUN]"):
+        return ERR_DRY_RUN, nan, nan, nan
+    m = TELEPORTED_RE.match(r)
+    if m:
+        return ERR_OK, float(m.group(1)), float(m.group(2)), float(m.group(3))
+    # Mêmes motifs que la pause automatique : le code d'erreur ne peut pas la contredire
+    issue = _looks_offline_or_error(r)
+    if issue == REASON_RCON:
+        return ERR_RCON, nan, nan, nan
+    if issue == REASON_OFFLINE:
+        return ERR_OFFLINE, nan, nan, nan
+    return ERR_UNPARSED, nan, nan, nan
+
+
+class HistoryWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self.f = None
+
+    def append(self, step: int, t: float, x: int, y: int, z: int, resp: str, latency: float) -> int:
+        err, rx, ry, rz = classify_response(resp)
+        if self.f is None:
+            self.f = open(self.path, "ab", buffering=0)
+            # Une écriture interrompue laisse un enregistrement partiel : on réaligne
+            extra = self.f.tell() % RECORD.size
+            if extra:
+                self.f.truncate(self.f.tell() - extra)
+                self.f.seek(0, os.SEEK_END)
+        self.f.write(RECORD.pack(step, t, x, y, z, rx, ry, rz, latency, err))
+        return err
+
+    def close(self):
+        if self.f is not None:
+            try:
+                self.f.close()
+            except OSError:
+                pass
+            self.f = None
+
+
+def load_history(path: str):
+    import numpy as np
+
+    dt = history_dtype()
+    size = os.path.getsize(path)
+    return np.fromfile(path, dtype=dt, count=size // dt.itemsize)
+
+
+def summarize(h, bucket_s: float = 3600.0) -> dict:
+    import numpy as np
+
+    out = {"count": int(h.size)}
+    if h.size == 0:
+        return out
+    t = h["t"]
+    err = h["err"]
+    lat = h["latency"].astype(np.float64)
+    span = float(t.max() - t.min())
+    out["span_s"] = span
+    out["tp_per_h"] = (h.size - 1) * 3600.0 / span if span > 0 else math.nan
+    codes, counts = np.unique(err, return_counts=True)
+    out["errors"] = {ERR_NAMES.get(int(c), str(int(c))): int(n) for c, n in zip(codes, counts, strict=True)}
+    out["error_rate"] = float(np.count_nonzero((err != ERR_OK) & (err != ERR_DRY_RUN)) / h.size)
+    ok = lat[np.isfinite(lat)]
+    if ok.size:
+        p50, p90, p99 = np.percentile(ok, [50, 90, 99])
+        out["latency_ms"] = {
+            "p50": p50 * 1000.0,
+            "p90": p90 * 1000.0,
+            "p99": p99 * 1000.0,
+            "max": float(ok.max()) * 1000.0,
+        }
+    idx = ((t - t.min()) // bucket_s).astype(np.int64)
+    n_buckets = int(idx.max()) + 1
+    tp = np.bincount(idx, minlength=n_buckets)
+    bad = np.bincount(idx, weights=((err != ERR_OK) & (err != ERR_DRY_RUN)).astype(np.float64), minlength=n_buckets)
+    lat_sum = np.bincount(idx, weights=np.nan_to_num(lat), minlength=n_buckets)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out["buckets"] = [
+            {
+                "start_s": i * bucket_s,
+                "tps": int(tp[i]),
+                "errors": int(bad[i]),
+                "latency_ms": lat_sum[i] / tp[i] * 1000.0,
+            }
+            for i in range(n_buckets)
+        ]
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser(description="Résumé de l'historique des TP (.history)")
+    p.add_argument("path")
+    p.add_argument("--bucket", type=float, default=3600.0, help="taille des tranches en secondes")
+    args = p.parse_args()
+    if not args.path.endswith(".history") and os.path.isfile(history_path(args.path)):
+        args.path = history_path(args.path)
+    if not os.path.isfile(args.path):
+        print("fichier introuvable", file=sys.stderr)
+        sys.exit(1)
+    # numpy n'est requis que pour ce résumé : l'écriture de l'historique s'en passe
+    try:
+        s = summarize(load_history(args.path), args.bucket)
+    except ImportError:
+        print("numpy est requis pour lire l'historique : pip install numpy", file=sys.stderr)
+        sys.exit(1)
+    print(f"TP enregistrés : {s['count']}")
+    if not s["count"]:
+        return
+    print(f"Durée couverte : {s['span_s'] / 3600.0:.2f} h — débit moyen : {s['tp_per_h']:.1f} TP/h")
+    print(f"Taux d'erreur : {s['error_rate'] * 100.0:.2f}%")
+    for name, n in s["errors"].items():
+        print(f"  {name} : {n}")
+    if "latency_ms" in s:
+        lat = s["latency_ms"]
+        print(
+            f"Latence RCON (ms) : p50={lat['p50']:.1f} p90={lat['p90']:.1f} p99={lat['p99']:.1f} max={lat['max']:.1f}"
+        )
+    print(f"{'début (h)':>10} {'TP':>6} {'erreurs':>8} {'latence (ms)':>13}")
+    for b in s["buckets"]:
+        print(f"{b['start_s'] / 3600.0:>10.2f} {b['tps']:>6} {b['errors']:>8} {b['latency_ms']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
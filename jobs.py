@@ -0,0 +1,99 @@
+import copy
+import re
+import time
+from dataclasses import dataclass
+from typing import Any
+
+from config import Config
+
+JOB_MODES = ("sequential", "concurrent")
+_WINDOW_RE = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*$")
+
+
+@dataclass(frozen=True, slots=True)
+class Job:
+    name: str
+    priority: int
+    window: tuple[int, int] | None
+    conf: dict
+    cfg: Config
+
+    @property
+    def player(self) -> str:
+        return self.cfg.exploration.player
+
+
+def parse_window(s: str) -> tuple[int, int] | None:
+    if not s:
+        return None
+    m = _WINDOW_RE.match(str(s))
+    if not m:
+        raise ValueError(f"fenêtre horaire invalide : {s} (attendu HH:MM-HH:MM)")
+    h1, m1, h2, m2 = (int(g) for g in m.groups())
+    if h1 > 23 or h2 > 23 or m1 > 59 or m2 > 59:
+        raise ValueError(f"fenêtre horaire invalide : {s}")
+    if (h1, m1) == (h2, m2):
+        # Fenêtre vide : le job attendrait indéfiniment son ouverture
+        raise ValueError(f"fenêtre horaire vide : {s} (début et fin identiques)")
+    return h1 * 60 + m1, h2 * 60 + m2
+
+
+def _minute_of_day(now: float) -> float:
+    t = time.localtime(now)
+    return t.tm_hour * 60 + t.tm_min + t.tm_sec / 60.0
+
+
+def in_window(job: Job, now: float | None = None) -> bool:
+    if job.window is None:
+        return True
+    start, end = job.window
+    m = _minute_of_day(time.time() if now is None else now)
+    if start <= end:
+        return start <= m < end
+    return m >= start or m < end
+
+
+def seconds_until_open(job: Job, now: float | None = None) -> float:
+    if job.window is None or in_window(job, now):
+        return 0.0
+    m = _minute_of_day(time.time() if now is None else now)
+    return ((job.window[0] - m) % 1440) * 60.0
+
+
+def window_deadline(job: Job, now: float | None = None) -> float | None:
+    if job.window is None:
+        return None
+    now = time.time() if now is None else now
+    m = _minute_of_day(now)
+    return now + ((job.window[1] - m) % 1440) * 60.0
+
+
+def load_jobs(conf: dict[str, Any]) -> list[Job]:
+    jobs = []
+    for i, ent in enumerate(conf.get("jobs") or []):
+        name = str(ent.get("name") or f"job{i + 1}")
+        job_conf = copy.deepcopy(conf)
+        job_conf["exploration"].update(ent.get("exploration") or {})
+        try:
+            cfg = Config.from_dict(job_conf)
+            window = parse_window(ent.get("window", ""))
+            priority = int(ent.get("priority", 0))
+        except ValueError as e:
+            raise ValueError(f"job {name} : {e}") from None
+        jobs.append(Job(name=name, priority=priority, window=window, conf=job_conf, cfg=cfg))
+    # Priorité la plus haute d'abord, puis ordre du fichier
+    return sorted(jobs, key=lambda j: -j.priority)
+
+
+def jobs_mode(conf: dict[str, Any]) -> str:
+    mode = str(conf.get("jobs_mode", "sequential"))
+    if mode not in JOB_MODES:
+        raise ValueError(f"jobs_mode invalide : {mode} (attendu : {', '.join(JOB_MODES)})")
+    return mode
+
+
+def group_by_player(jobs: list[Job]) -> list[list[Job]]:
+    groups: dict[str, list[Job]] = {}
+    for j in jobs:
+        groups.setdefault(j.player.lower(), []).append(j)
+    return list(groups.values())
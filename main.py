@@ -1,10 +1,15 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import argparse
 import os
+import queue
 import select
+import signal
 import sys
 import termios
+import threading
+import time
 import tty
 
 from rich.box import ROUNDED
@@ -15,13 +20,23 @@ from rich.table import Table
 from rich.live import Live
 
 from chat import run_chat_console
-from config import compute_save_path, load_config, save_config
+from config import Config, ConfigWatcher, compute_save_path, save_config
 from config_menu import edit_config
 from control import run_free_control
+from headless import EventLog
+from metrics import start_exporters, stop_exporters
+from history import HistoryWriter, history_path
+from presence import AutoResume
+from jobs import Job, group_by_player, in_window, jobs_mode, load_jobs, seconds_until_open, window_deadline
 from rcon_client import RconClient
+from save_index import SaveIndex, save_key_from_conf
 from spiral import rebuild_state_from_steps
-from state import SaveManager, SpiralState
-from tui import run_loop
+from state import SAVE_EXT_CODECS, SaveManager, SpiralState, save_codec_from_conf, save_policy_from_conf
+from scheduler import TPScheduler
+from throttle import throttle_from_config
+from tui import run_loop, run_viewer
+from utils import human_eta
+from verify import GenerationCheck
 
 console = Console()
 
@@ -99,36 +114,37 @@ def show_config(conf):
     t.add_row("Spawn (Z)", str(e["spawn_z"]))
     t.add_row("Intervalle (s)", str(e["interval"]))
     t.add_row("/tp max", str(e["max_tps"]))
+    t.add_row("Sauvegarde", str(conf.get("save_policy", {}).get("mode", "every_tp")))
     t.add_row("Dossier playerdata", str(conf.get("nbt", {}).get("playerdata", "/srv/minecraft/world/playerdata")))
     t.add_row("usernamecache.json", str(conf.get("nbt", {}).get("usernamecache", "/srv/minecraft/usernamecache.json")))
     console.print(t)
 
 
-def build_state(conf) -> SpiralState:
-    e = conf["exploration"]
+def build_state(cfg: Config) -> SpiralState:
+    e = cfg.exploration
     return SpiralState(
-        player=e["player"],
-        dimension=e["dimension"],
-        y=int(e["y"]),
-        chunk_step=int(e["chunks"]),
-        step_blocks=int(e["chunks"]) * 16,
-        spawn_x=int(e["spawn_x"]),
-        spawn_z=int(e["spawn_z"]),
-        current_x=int(e["spawn_x"]),
-        current_z=int(e["spawn_z"]),
-        interval_s=float(e["interval"]),
-        max_tps=(None if int(e["max_tps"]) == -1 else int(e["max_tps"])),
-        host=str(conf["rcon"]["host"]),
-        port=int(conf["rcon"]["port"]),
+        player=e.player,
+        dimension=e.dimension,
+        y=e.y,
+        chunk_step=e.chunks,
+        step_blocks=e.step_blocks,
+        spawn_x=e.spawn_x,
+        spawn_z=e.spawn_z,
+        current_x=e.spawn_x,
+        current_z=e.spawn_z,
+        interval_s=e.interval,
+        max_tps=e.max_tps,
+        host=cfg.rcon.host,
+        port=cfg.rcon.port,
     )
 
 
-def connect_rcon(conf, dry_run=False):
+def connect_rcon(cfg: Config, dry_run=False):
     rc = RconClient(
-        host=str(conf["rcon"]["host"]),
-        port=int(conf["rcon"]["port"]),
-        password=str(conf["rcon"]["password"]),
-        timeout=float(conf["rcon"]["timeout"]),
+        host=cfg.rcon.host,
+        port=cfg.rcon.port,
+        password=cfg.rcon.password,
+        timeout=cfg.rcon.timeout,
         dry_run=dry_run,
     )
     if dry_run:
@@ -161,44 +177,396 @@ def connect_rcon(conf, dry_run=False):
     return rc
 
 
-def run_exploration(conf, reset=False, dry_run=False):
-    state = build_state(conf)
+def open_save(conf, cfg: Config, reset=False, quiet=False) -> SaveManager:
     save_path = compute_save_path(conf)
+    if not reset and not os.path.isfile(save_path):
+        # L'intervalle et le /tp max entrent dans le hash : après un réglage à chaud, on passe par le catalogue,
+        # dont la clé garde le serveur RCON
+        found = SaveIndex(cfg.save_dir).load().lookup(save_key_from_conf(conf))
+        if found:
+            save_path = found
     os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
-    save = SaveManager(save_path)
+    try:
+        policy = save_policy_from_conf(conf)
+    except ValueError as e:
+        if not quiet:
+            console.print(f"[yellow]{e}. Politique par défaut utilisée.[/yellow]")
+        policy = None
+    try:
+        codec = save_codec_from_conf(conf)
+    except ValueError as e:
+        if not quiet:
+            console.print(f"[yellow]{e}. Format JSON utilisé.[/yellow]")
+        codec = "json"
+    # Une sauvegarde retrouvée par le catalogue garde le format de son extension, même si save_format a changé
+    kept = SAVE_EXT_CODECS.get(os.path.splitext(save_path)[1])
+    if kept is not None and kept != codec:
+        if not quiet:
+            console.print(f"[yellow]Sauvegarde existante au format {kept} : format conservé.[/yellow]")
+        codec = kept
+    return SaveManager(save_path, policy=policy, index=SaveIndex(cfg.save_dir), codec=codec)
+
+
+def load_state(save: SaveManager, cfg: Config, reset=False, quiet=False) -> SpiralState:
+    state = build_state(cfg)
     if not reset and save.exists():
         try:
             state = save.load()
-            console.print(f"[green]Sauvegarde chargée[/green] (TP effectués : {state.step_index})")
+            state.interval_s = cfg.exploration.interval
+            state.max_tps = cfg.exploration.max_tps
+            if not quiet:
+                console.print(f"[green]Sauvegarde chargée[/green] (TP effectués : {state.step_index})")
         except Exception as e:
-            console.print(f"[yellow]Impossible de charger la sauvegarde : {e}. Reprise à zéro.[/yellow]")
-    rc = connect_rcon(conf, dry_run=dry_run)
-    if rc is None:
-        return
+            if not quiet:
+                console.print(f"[yellow]Impossible de charger la sauvegarde : {e}. Reprise à zéro.[/yellow]")
+    return state
+
+
+def explore(
+    conf, cfg: Config, state: SpiralState, save: SaveManager, rc, watcher=None, stop_at: float | None = None
+) -> str | None:
+    history = HistoryWriter(history_path(save.path))
     try:
         while True:
-            action = run_loop(state, save, rc)
+            action = run_loop(
+                state,
+                save,
+                rc,
+                history,
+                watcher,
+                stop_at=stop_at,
+                max_catchup=cfg.exploration.max_catchup,
+                throttle=throttle_from_config(cfg),
+                log_file=cfg.tp_log_file,
+                auto_resume=lambda sched: AutoResume.from_config(sched, rc, cfg),
+                verifier=GenerationCheck.from_config(cfg, save.path),
+            )
             if action == "CONTROL":
                 try:
                     run_free_control(conf, rc)
                 except KeyboardInterrupt:
                     pass
                 continue
-            break
+            return action
+    finally:
+        save.close(state)
+        history.close()
+
+
+def run_exploration(watcher: ConfigWatcher, reset=False, dry_run=False):
+    conf, cfg = watcher.raw, watcher.current
+    save = open_save(conf, cfg, reset)
+    if not save.acquire():
+        owner = save.lock_owner() or {}
+        console.print(
+            f"[yellow]Sauvegarde déjà utilisée par PID {owner.get('pid', '?')} sur {owner.get('host', '?')} : "
+            "ouverture en lecture seule.[/yellow]"
+        )
+        try:
+            run_viewer(save)
+        except KeyboardInterrupt:
+            pass
+        return
+    if save.lock.stale:
+        console.print(f"[dim]Verrou orphelin repris (PID {save.lock.stale.get('pid', '?')}).[/dim]")
+    state = load_state(save, cfg, reset)
+    rc = connect_rcon(cfg, dry_run=dry_run)
+    if rc is None:
+        save.close()
+        return
+    try:
+        explore(conf, cfg, state, save, rc, watcher)
     except KeyboardInterrupt:
         console.print("\n[bold]Interruption[/bold] — sauvegarde et sortie…")
-        SaveManager(save_path).save(state)
     finally:
         rc.close()
 
 
-def rebuild_save(conf):
+def _job_finished(state: SpiralState) -> bool:
+    return state.max_tps is not None and state.max_tps >= 0 and state.step_index >= state.max_tps
+
+
+def run_jobs(watcher: ConfigWatcher, dry_run=False):
+    conf = watcher.raw
+    try:
+        jobs = load_jobs(conf)
+        mode = jobs_mode(conf)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]\n")
+        return
+    if not jobs:
+        console.print('[yellow]Aucun job défini (clé "jobs" de config.json).[/yellow]\n')
+        return
+    if mode == "concurrent" and len(group_by_player(jobs)) > 1:
+        run_jobs_concurrent(jobs, dry_run)
+        return
+    rc = connect_rcon(watcher.current, dry_run=dry_run)
+    if rc is None:
+        return
+    pending = list(jobs)
+    try:
+        while pending:
+            job = next((j for j in pending if in_window(j)), None)
+            if job is None:
+                wait = min(seconds_until_open(j) for j in pending)
+                console.print(f"[dim]Aucun job dans sa fenêtre horaire, reprise dans {human_eta(wait)}…[/dim]")
+                time.sleep(wait + 1.0)
+                continue
+            console.print(f"[bold]Job {job.name}[/bold] — {job.player} en {job.cfg.exploration.dimension}")
+            save = open_save(job.conf, job.cfg)
+            if not save.acquire():
+                console.print(f"[yellow]Job {job.name} ignoré : sauvegarde utilisée par une autre session.[/yellow]")
+                pending.remove(job)
+                continue
+            state = load_state(save, job.cfg)
+            if _job_finished(state):
+                save.close()
+                pending.remove(job)
+                continue
+            action = explore(job.conf, job.cfg, state, save, rc, stop_at=window_deadline(job))
+            if action == "WINDOW":
+                console.print(f"[dim]Job {job.name} : fin de fenêtre horaire, mis en attente.[/dim]")
+                continue
+            if action != "DONE":
+                break
+            pending.remove(job)
+        if not pending:
+            console.print("[green]File de jobs terminée.[/green]\n")
+    except KeyboardInterrupt:
+        console.print("\n[bold]Interruption[/bold] — file de jobs arrêtée.")
+    finally:
+        rc.close()
+
+
+def _job_worker(group: list[Job], dry_run: bool, stop: threading.Event, status: dict):
+    cfg0 = group[0].cfg
+    rc = RconClient(cfg0.rcon.host, cfg0.rcon.port, cfg0.rcon.password, cfg0.rcon.timeout, dry_run=dry_run)
+    pending = list(group)
+    try:
+        while pending and not stop.is_set():
+            job = next((j for j in pending if in_window(j)), None)
+            if job is None:
+                wait = min(seconds_until_open(j) for j in pending)
+                for j in pending:
+                    status[j.name] = {"etat": "attente fenêtre", "detail": human_eta(seconds_until_open(j))}
+                stop.wait(min(wait + 1.0, 30.0))
+                continue
+            save = open_save(job.conf, job.cfg, quiet=True)
+            if not save.acquire():
+                status[job.name] = {"etat": "verrouillé", "detail": "sauvegarde utilisée ailleurs"}
+                pending.remove(job)
+                continue
+            state = load_state(save, job.cfg, quiet=True)
+            if _job_finished(state):
+                save.close()
+                status[job.name] = {"etat": "terminé", "detail": f"{state.step_index} TP"}
+                pending.remove(job)
+                continue
+            # Même chaîne que le mode headless : cadence, rattrapage, régulation, vérification et reprise
+            # pilotée par latest.log, sans commande de sondage
+            history = HistoryWriter(history_path(save.path))
+            sched = TPScheduler(
+                state,
+                save,
+                rc,
+                history,
+                max_catchup=job.cfg.exploration.max_catchup,
+                stop_at=window_deadline(job),
+                throttle=throttle_from_config(job.cfg),
+                verifier=GenerationCheck.from_config(job.cfg, save.path),
+            )
+
+            def _on_sched(event, data, name=job.name):
+                if event == "pause":
+                    status[name] = {"etat": "en pause", "detail": data}
+
+            sched.listeners.append(_on_sched)
+            resumer = AutoResume.from_config(sched, rc, job.cfg)
+            if resumer is not None:
+                resumer.start()
+            sched.start()
+            try:
+                while True:
+                    if stop.is_set():
+                        sched.stop()
+                    try:
+                        ev = sched.events.get(timeout=1.0)
+                    except queue.Empty:
+                        continue
+                    if ev is None:
+                        break
+                    status[job.name] = {
+                        "etat": "en pause" if ev.issue else "actif",
+                        "detail": f"TP {ev.step} → X={ev.x} Z={ev.z}",
+                    }
+            finally:
+                if resumer is not None:
+                    resumer.stop()
+                sched.stop()
+                sched.join()
+                save.close(state)
+                history.close()
+            if sched.result == "DONE":
+                status[job.name] = {"etat": "terminé", "detail": f"{state.step_index} TP"}
+                pending.remove(job)
+            elif sched.result == "WINDOW":
+                status[job.name] = {"etat": "hors fenêtre", "detail": f"{state.step_index} TP"}
+    finally:
+        rc.close()
+
+
+def run_jobs_concurrent(jobs: list[Job], dry_run=False):
+    stop = threading.Event()
+    status: dict[str, dict] = {j.name: {"etat": "en attente", "detail": ""} for j in jobs}
+    threads = [
+        threading.Thread(target=_job_worker, args=(g, dry_run, stop, status), daemon=True)
+        for g in group_by_player(jobs)
+    ]
+    for t in threads:
+        t.start()
+
+    def _render():
+        t = Table(title="File de jobs (concurrente)", box=ROUNDED)
+        t.add_column("Job")
+        t.add_column("Joueur")
+        t.add_column("Priorité", justify="right")
+        t.add_column("État")
+        t.add_column("Détail")
+        for j in jobs:
+            st = status.get(j.name, {})
+            t.add_row(j.name, j.player, str(j.priority), str(st.get("etat", "")), str(st.get("detail", "")))
+        return Group(t, "[grey50]Échap pour arrêter tous les jobs[/grey50]")
+
+    try:
+        with Live(_render(), auto_refresh=False, screen=False) as live:
+            while any(t.is_alive() for t in threads):
+                k = read_key_ext(timeout=1.0)
+                if k == "ESC":
+                    break
+                live.update(_render())
+                live.refresh()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for t in threads:
+            t.join(timeout=10.0)
+    console.print("[green]File de jobs arrêtée.[/green]\n")
+
+
+def run_headless(config_path="config.json", log_path=None, reset=False, dry_run=False) -> int:
+    log = EventLog(log_path)
+    try:
+        watcher = ConfigWatcher(config_path).start()
+    except ValueError as e:
+        log.emit("error", reason=f"configuration invalide : {e}")
+        log.close()
+        return 2
+    conf, cfg = watcher.raw, watcher.current
+    try:
+        exporters = start_exporters(cfg)
+    except OSError as e:
+        log.emit("error", reason=f"métriques indisponibles : {e}")
+        exporters = []
+    save = open_save(conf, cfg, reset, quiet=True)
+    if not save.acquire():
+        owner = save.lock_owner() or {}
+        log.emit("error", reason="sauvegarde verrouillée", pid=owner.get("pid"), host=owner.get("host"))
+        stop_exporters(exporters)
+        watcher.stop()
+        log.close()
+        return 1
+    state = load_state(save, cfg, reset, quiet=True)
+    rc = RconClient(cfg.rcon.host, cfg.rcon.port, cfg.rcon.password, cfg.rcon.timeout, dry_run=dry_run)
+    history = HistoryWriter(history_path(save.path))
+    verifier = GenerationCheck.from_config(cfg, save.path)
+    sched = TPScheduler(
+        state,
+        save,
+        rc,
+        history,
+        max_catchup=cfg.exploration.max_catchup,
+        throttle=throttle_from_config(cfg),
+        verifier=verifier,
+    )
+    stopped_by: list[str] = []
+
+    def _on_config(new, old):
+        sched.retune(new.exploration.interval)
+        log.emit("config", interval_s=new.exploration.interval)
+
+    resumer = AutoResume.from_config(sched, rc, cfg, on_resume=lambda: log.emit("resume", step=state.step_index))
+
+    def _on_signal(signum, frame):
+        stopped_by.append(signal.Signals(signum).name)
+        sched.stop()
+
+    def _on_sched(event, data):
+        if event == "pause":
+            log.emit("pause", step=state.step_index, reason=data)
+
+    watcher.subscribe(_on_config)
+    sched.listeners.append(_on_sched)
+    prev = {sig: signal.signal(sig, _on_signal) for sig in (signal.SIGTERM, signal.SIGINT)}
+    log.emit(
+        "start",
+        save=save.path,
+        step=state.step_index,
+        player=state.player,
+        dimension=state.dimension,
+        interval_s=state.interval_s,
+        dry_run=dry_run,
+    )
+    if resumer is not None:
+        resumer.start()
+    sched.start()
+    try:
+        while True:
+            # Bloquant tant que rien ne se passe : la reprise est pilotée par les événements
+            ev = sched.events.get()
+            if ev is None:
+                break
+            log.tp(ev)
+    finally:
+        if resumer is not None:
+            resumer.stop()
+        sched.stop()
+        sched.join()
+        watcher.unsubscribe(_on_config)
+        for sig, h in prev.items():
+            signal.signal(sig, h)
+        save.close(state)
+        history.close()
+        rc.close()
+        stop_exporters(exporters)
+        watcher.stop()
+        reason = sched.result or (stopped_by[0] if stopped_by else "stop")
+        if verifier is not None:
+            log.emit("stop", step=state.step_index, reason=reason, retry_pending=len(verifier.pending))
+        else:
+            log.emit("stop", step=state.step_index, reason=reason)
+        log.close()
+    return 0
+
+
+def rebuild_save(watcher: ConfigWatcher):
+    conf = watcher.raw
     n = IntPrompt.ask("Nombre de TP déjà effectués ?", default=0)
-    base = build_state(conf)
+    base = build_state(watcher.current)
     rebuilt = rebuild_state_from_steps(base, n)
     save_path = compute_save_path(conf)
     os.makedirs(os.path.dirname(save_path) or ".", exist_ok=True)
-    SaveManager(save_path).save(rebuilt)
+    try:
+        codec = save_codec_from_conf(conf)
+    except ValueError:
+        codec = "json"
+    index = SaveIndex(str(conf.get("save_dir", "saves")))
+    save = SaveManager(save_path, index=index, codec=codec)
+    if not save.acquire():
+        owner = save.lock_owner() or {}
+        console.print(f"[red]Sauvegarde utilisée par PID {owner.get('pid', '?')} sur {owner.get('host', '?')}.[/red]")
+        return
+    save.close(rebuilt)
     console.print(f"[green]Sauvegarde reconstruite[/green] comme si {n} /tp avaient été effectués.")
     console.print(f"Position attendue : X={rebuilt.current_x} Y={rebuilt.y} Z={rebuilt.current_z}")
 
@@ -215,6 +583,7 @@ def menu_once(conf, dry_run):
         "Contrôle libre",
         "Chat + Commandes RCON",
         "Obtenir IPs d'un serveur",
+        "File de jobs (profils d'exploration)",
     ]
 
     def _build_config_table(conf):
@@ -233,6 +602,7 @@ def menu_once(conf, dry_run):
         t.add_row("Spawn (Z)", str(e["spawn_z"]))
         t.add_row("Intervalle (s)", str(e["interval"]))
         t.add_row("/tp max", str(e["max_tps"]))
+        t.add_row("Sauvegarde", str(conf.get("save_policy", {}).get("mode", "every_tp")))
         t.add_row("Dossier playerdata", str(conf.get("nbt", {}).get("playerdata", "/srv/minecraft/world/playerdata")))
         t.add_row("usernamecache.json", str(conf.get("nbt", {}).get("usernamecache", "/srv/minecraft/usernamecache.json")))
         return t
@@ -242,12 +612,12 @@ def menu_once(conf, dry_run):
         lines = []
         for i, text in enumerate(opts):
             pref = "➤ " if i == sel else "  "
-            n = str(i + 1)
+            n = str((i + 1) % 10)
             if i == sel:
                 lines.append(f"{pref}[orange1][{n}][/orange1] [green]{text}[/]")
             else:
                 lines.append(f"{pref}[cyan][{n}][/cyan] [white]{text}[/]")
-        body = "\n".join(["", "Menu :", *lines, "", "[grey50]Utilisez ↑/↓ puis Entrée, ou tapez 1-9, Échap pour quitter[/grey50]", ""])
+        body = "\n".join(["", "Menu :", *lines, "", "[grey50]Utilisez ↑/↓ puis Entrée, ou tapez 0-9, Échap pour quitter[/grey50]", ""])
         return Group(t, body)
 
     choice = None
@@ -262,61 +632,89 @@ def menu_once(conf, dry_run):
                 sel = (sel + 1) % len(opts)
                 live.update(_render(sel))
                 continue
-            if k in set("123456789"):
+            if k in set("0123456789"):
                 choice = k
                 break
             if k == "ENTER":
-                choice = str(sel + 1)
+                choice = str((sel + 1) % 10)
                 break
             if k == "ESC":
                 choice = "\x1b"
                 break
 
-    if choice in set("123456789"):
+    if choice in set("0123456789"):
         console.print(f"Choix : {choice}\n")
     elif choice == "\x1b":
         console.print("Choix : Esc\n")
     return choice
 
 
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Spirale Carrée RCON")
+    p.add_argument("--headless", action="store_true", help="exploration sans interface, événements NDJSON")
+    p.add_argument("--config", default="config.json", help="fichier de configuration")
+    p.add_argument("--log", help="fichier NDJSON (par défaut : sortie standard)")
+    p.add_argument("--reset", action="store_true", help="repartir de zéro (mode headless)")
+    p.add_argument("--dry-run", action="store_true", help="mode simulation")
+    return p.parse_args(argv)
+
+
 def main():
+    args = parse_args()
+    if args.headless:
+        sys.exit(run_headless(args.config, args.log, reset=args.reset, dry_run=args.dry_run))
     console.print("")
     banner()
-    conf = load_config("config.json")
-    dry_run = False
+    try:
+        watcher = ConfigWatcher(args.config).start()
+    except ValueError as e:
+        console.print(f"[red]Configuration invalide : {e}[/red]")
+        return
+    try:
+        exporters = start_exporters(watcher.current)
+    except OSError as e:
+        console.print(f"[yellow]Métriques indisponibles : {e}[/yellow]")
+        exporters = []
+    dry_run = args.dry_run
     while True:
+        conf = watcher.raw
+        if watcher.error:
+            console.print(f"[yellow]config.json ignoré, configuration conservée : {watcher.error}[/yellow]")
         ch = menu_once(conf, dry_run)
         if ch == "1":
-            run_exploration(conf, reset=False, dry_run=dry_run)
+            run_exploration(watcher, reset=False, dry_run=dry_run)
         elif ch == "2":
-            run_exploration(conf, reset=True, dry_run=dry_run)
+            run_exploration(watcher, reset=True, dry_run=dry_run)
         elif ch == "3":
-            rebuild_save(conf)
+            rebuild_save(watcher)
         elif ch == "4":
             new_conf = edit_config(conf, console, read_key_ext)
             if new_conf is not None:
-                conf = new_conf
-                save_config(conf, "config.json")
-                console.print("\n[green]Configuration enregistrée[/green]\n")
+                save_config(new_conf, args.config)
+                watcher.reload()
+                if watcher.error:
+                    console.print(f"\n[red]Configuration invalide : {watcher.error}[/red]\n")
+                else:
+                    console.print("\n[green]Configuration enregistrée[/green]\n")
         elif ch == "5":
-            rc = connect_rcon(conf, dry_run=dry_run)
+            rc = connect_rcon(watcher.current, dry_run=dry_run)
             if rc:
                 rc.close()
         elif ch == "6":
             dry_run = not dry_run
             console.print(f"Mode simulation = {'ON' if dry_run else 'OFF'}\n")
         elif ch == "7":
-            rc = connect_rcon(conf, dry_run=dry_run)
+            rc = connect_rcon(watcher.current, dry_run=dry_run)
             if rc:
                 try:
                     run_free_control(conf, rc)
                 finally:
                     rc.close()
         elif ch == "8":
-            rc = connect_rcon(conf, dry_run=dry_run)
+            rc = connect_rcon(watcher.current, dry_run=dry_run)
             if rc:
                 try:
-                    run_chat_console(conf, rc)
+                    run_chat_console(conf, rc, watcher)
                 finally:
                     rc.close()
         elif ch == "9":
@@ -326,9 +724,12 @@ def main():
                 mcr.main()
             except Exception as e:
                 console.print(f"[red]Erreur mc_resolve : {e}[/red]")
+        elif ch == "0":
+            run_jobs(watcher, dry_run=dry_run)
         elif ch == "\x1b":
             console.print(" --- PROGRAMME TERMINÉ --- \n")
             break
+    stop_exporters(exporters)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,268 @@
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+# Format texte Prometheus 0.0.4 : celui du collecteur textfile de node_exporter et des clients sans OpenMetrics
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _esc(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_esc(v)}"' for n, v in zip(names, values, strict=True)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return repr(v)
+
+
+class _Metric:
+    kind = "unknown"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: dict[tuple, object] = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self, openmetrics: bool = True) -> list[str]:
+        if openmetrics:
+            return [f"# TYPE {self.name} {self.kind}", f"# HELP {self.name} {_esc(self.help)}"]
+        return [f"# HELP {self.name} {_esc(self.help)}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def header(self, openmetrics: bool = True) -> list[str]:
+        if openmetrics:
+            return super().header()
+        # Prometheus 0.0.4 : TYPE et HELP nomment la série échantillonnée, suffixe _total compris
+        return [f"# HELP {self.name}_total {_esc(self.help)}", f"# TYPE {self.name}_total counter"]
+
+    def inc(self, amount: float = 1.0, **labels):
+        k = self._key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}_total{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        k = self._key(labels)
+        with self._lock:
+            self._values[k] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        k = self._key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_num(float(v))}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        k = self._key(labels)
+        with self._lock:
+            h = self._values.get(k)
+            if h is None:
+                h = self._values[k] = [[0] * len(self.buckets), 0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    h[0][i] += 1
+                    break
+            h[1] += value
+            h[2] += 1
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            items = [(k, (list(h[0]), h[1], h[2])) for k, h in self._values.items()]
+        out = []
+        for k, (counts, total, n) in items:
+            acc = 0
+            for b, c in zip(self.buckets, counts, strict=True):
+                acc += c
+                le = 'le="' + _num(b) + '"'
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, k, le)} {acc}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, k)} {_num(total)}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, k)} {n}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, m: _Metric):
+        with self._lock:
+            return self._metrics.setdefault(m.name, m)
+
+    def counter(self, name: str, help: str, labels: tuple = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: tuple = ()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: tuple = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def render(self, openmetrics: bool = True) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for m in metrics:
+            lines += m.header(openmetrics)
+            lines += m.collect()
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+TP_TOTAL = REGISTRY.counter("spiral_tp", "TP envoyés")
+TP_ERRORS = REGISTRY.counter("spiral_tp_errors", "TP en erreur par motif", ("reason",))
+TP_LATENCY = REGISTRY.histogram("spiral_tp_latency_seconds", "Latence RCON des TP")
+TP_STEP = REGISTRY.gauge("spiral_step", "Index du dernier TP")
+TP_LAST = REGISTRY.gauge("spiral_last_tp_timestamp_seconds", "Horodatage du dernier TP")
+TP_INTERVAL = REGISTRY.gauge("spiral_interval_seconds", "Intervalle courant entre deux TP")
+PAUSED = REGISTRY.gauge("spiral_paused", "Exploration en pause (1) ou active (0)")
+PAUSES = REGISTRY.counter("spiral_pauses", "Pauses automatiques par motif", ("reason",))
+QUEUE_DEPTH = REGISTRY.gauge("spiral_pipeline_queue_depth", "Profondeur des files du pipeline TP", ("stage",))
+RCON_COMMANDS = REGISTRY.counter("rcon_commands", "Commandes RCON envoyées")
+RCON_ERRORS = REGISTRY.counter("rcon_errors", "Commandes RCON en échec")
+RCON_RECONNECTS = REGISTRY.counter("rcon_reconnects", "Reconnexions RCON")
+RCON_SECONDS = REGISTRY.histogram("rcon_command_seconds", "Durée des commandes RCON")
+POLL_SECONDS = REGISTRY.histogram("chat_poll_seconds", "Durée d'un passage de poller", ("poller",))
+POLL_ERRORS = REGISTRY.counter("chat_poll_errors", "Passages de poller en échec", ("poller",))
+LOGTAIL_LINES = REGISTRY.counter("logtail_lines", "Lignes lues dans latest.log")
+LOGTAIL_ROTATIONS = REGISTRY.counter("logtail_rotations", "Rotations de latest.log détectées")
+ARCHIVE_CACHE = REGISTRY.counter("chat_archive_cache", "Archives .log.gz lues en cache ou analysées", ("result",))
+VERIFY_CHECKS = REGISTRY.counter("spiral_verify_checks", "Vérifications de génération par résultat", ("result",))
+VERIFY_PENDING = REGISTRY.gauge("spiral_verify_pending", "TP en attente de reprise")
+VERIFY_DROPPED = REGISTRY.counter("spiral_verify_dropped", "TP abandonnés après les reprises ou file pleine")
+
+
+def observe_poll(poller: str, t0: float, failed: bool = False) -> None:
+    POLL_SECONDS.observe(time.monotonic() - t0, poller=poller)
+    if failed:
+        POLL_ERRORS.inc(poller=poller)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        # OpenMetrics seulement si le client le demande, comme Prometheus avec Accept
+        openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+        body = self.registry.render(openmetrics).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_http(host: str, port: int, registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    handler = type("Handler", (_Handler,), {"registry": registry})
+    srv = ThreadingHTTPServer((host, port), handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, name="metrics-http", daemon=True).start()
+    return srv
+
+
+class TextfileWriter(threading.Thread):
+    def __init__(self, path: str, interval_s: float, registry: Registry = REGISTRY):
+        super().__init__(name="metrics-textfile", daemon=True)
+        self.path = path
+        self.interval_s = interval_s
+        self.registry = registry
+        self._stop_evt = threading.Event()
+
+    def write(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.registry.render(openmetrics=False))
+        # Renommage atomique : le collecteur ne lit jamais un fichier à moitié écrit
+        os.replace(tmp, self.path)
+
+    def run(self):
+        while not self._stop_evt.is_set():
+            try:
+                self.write()
+            except OSError:
+                pass
+            self._stop_evt.wait(self.interval_s)
+
+    def stop(self):
+        self._stop_evt.set()
+        try:
+            self.write()
+        except OSError:
+            pass
+
+
+def start_exporters(cfg) -> list:
+    m = cfg.metrics
+    started = []
+    if not m.enabled:
+        return started
+    if m.http_port:
+        started.append(serve_http(m.http_host, m.http_port))
+    if m.textfile:
+        w = TextfileWriter(m.textfile, m.textfile_interval)
+        w.start()
+        started.append(w)
+    return started
+
+
+def stop_exporters(started: list) -> None:
+    for s in started:
+        if isinstance(s, TextfileWriter):
+            s.stop()
+        else:
+            s.shutdown()
+            s.server_close()
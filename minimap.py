@@ -0,0 +1,122 @@
+from rich.text import Text
+
+BRAILLE = 0x2800
+# Bit du point braille par (ligne, colonne) dans une cellule de 2 × 4 points
+_DOT = ((0x01, 0x08), (0x02, 0x10), (0x04, 0x20), (0x40, 0x80))
+LEVELS = 16
+PLAN_MAX = 20000
+
+STYLE_PLAYER = "bold red"
+STYLE_OVERLAP = "yellow"
+STYLE_VISITED = "green"
+STYLE_PLAN = "grey37"
+
+
+# Cases de la grille des pas, agrégées par niveaux : au niveau L une case couvre 2^L × 2^L pas.
+# L'ajout coûte O(LEVELS) ; le niveau 0 compte les passages pour repérer les recouvrements.
+class StepGrid:
+    def __init__(self, levels: int = LEVELS):
+        self.counts: dict[tuple[int, int], int] = {}
+        self.levels: list = [self.counts] + [set() for _ in range(levels - 1)]
+        self.bbox: tuple[int, int, int, int] | None = None
+
+    def add(self, cx: int, cz: int) -> None:
+        self.counts[(cx, cz)] = self.counts.get((cx, cz), 0) + 1
+        for lvl in range(1, len(self.levels)):
+            self.levels[lvl].add((cx >> lvl, cz >> lvl))
+        b = self.bbox
+        self.bbox = (cx, cz, cx, cz) if b is None else (min(b[0], cx), min(b[1], cz), max(b[2], cx), max(b[3], cz))
+
+    def clear(self) -> None:
+        self.counts.clear()
+        for s in self.levels[1:]:
+            s.clear()
+        self.bbox = None
+
+
+# Mini-carte braille centrée sur le joueur : un point par case du niveau choisi pour que les pas
+# visités et le plan restant tiennent dans le panneau. Le rendu lit au plus 8 cases par caractère.
+class Minimap:
+    def __init__(self, origin_x: int, origin_z: int, unit: int):
+        self.origin_x = origin_x
+        self.origin_z = origin_z
+        self.unit = max(1, int(unit))
+        self.visited = StepGrid()
+        self.plan = StepGrid()
+        self.version = 0
+        self.scale = self.unit
+        self._key = None
+        self._text = None
+
+    def cell(self, x: float, z: float) -> tuple[int, int]:
+        u = self.unit
+        return int((x - self.origin_x + u // 2) // u), int((z - self.origin_z + u // 2) // u)
+
+    def visit(self, x: float, z: float) -> None:
+        self.visited.add(*self.cell(x, z))
+        self.version += 1
+
+    def set_plan(self, points) -> None:
+        self.plan.clear()
+        for n, (x, z) in enumerate(points):
+            if n >= PLAN_MAX:
+                break
+            self.plan.add(*self.cell(x, z))
+        self.version += 1
+
+    def _level(self, pcx: int, pcz: int, wd: int, hd: int) -> int:
+        need = 1.0
+        for b in (self.visited.bbox, self.plan.bbox):
+            if b is None:
+                continue
+            need = max(
+                need,
+                max(pcx - b[0], b[2] - pcx) / max(1, wd // 2 - 1),
+                max(pcz - b[1], b[3] - pcz) / max(1, hd // 2 - 1),
+            )
+        lvl = 0
+        while (1 << lvl) < need and lvl < LEVELS - 1:
+            lvl += 1
+        return lvl
+
+    def render(self, px: float, pz: float, cols: int, rows: int) -> Text:
+        pcx, pcz = self.cell(px, pz)
+        key = (pcx, pcz, cols, rows, self.version)
+        if key == self._key:
+            return self._text
+        wd, hd = cols * 2, rows * 4
+        lvl = self._level(pcx, pcz, wd, hd)
+        me = (pcx >> lvl, pcz >> lvl)
+        x0 = me[0] - wd // 2
+        z0 = me[1] - hd // 2
+        vis = self.visited.levels[lvl]
+        plan = self.plan.levels[lvl]
+        text = Text(no_wrap=True)
+        for r in range(rows):
+            for c in range(cols):
+                bits_v = bits_p = 0
+                style = STYLE_VISITED
+                for dr in range(4):
+                    cz = z0 + r * 4 + dr
+                    for dc in range(2):
+                        k = (x0 + c * 2 + dc, cz)
+                        if k == me:
+                            bits_v |= _DOT[dr][dc]
+                            style = STYLE_PLAYER
+                        elif k in vis:
+                            bits_v |= _DOT[dr][dc]
+                            if lvl == 0 and style == STYLE_VISITED and vis[k] > 1:
+                                style = STYLE_OVERLAP
+                        elif k in plan:
+                            bits_p |= _DOT[dr][dc]
+                if bits_v:
+                    text.append(chr(BRAILLE + bits_v), style)
+                elif bits_p:
+                    text.append(chr(BRAILLE + bits_p), STYLE_PLAN)
+                else:
+                    text.append(" ")
+            if r < rows - 1:
+                text.append("\n")
+        self.scale = self.unit << lvl
+        self._key, self._text = key, text
+        return text
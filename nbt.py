@@ -1,13 +1,13 @@
 #!/usr/bin/env python3
 import argparse
+import gzip
 import json
 import os
+import struct
 import sys
+import threading
 from glob import glob
 
-import nbtlib
-import numpy as np
-
 from config import load_config
 
 FIELDS = {
@@ -48,7 +48,152 @@ def load_usernames(path: str) -> dict:
         return {}
 
 
+# Index nom ↔ UUID de usernamecache.json, partagé et reconstruit seulement si le fichier change
+class UsernameIndex:
+    def __init__(self, path: str):
+        self.path = path
+        self._stamp = None
+        self._by_name: dict[str, str] = {}
+        self._by_uuid: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def _refresh(self):
+        stamp = self._stat()
+        if stamp == self._stamp:
+            return
+        by_name, by_uuid = {}, {}
+        raw = load_usernames(self.path)
+        items = raw.items() if isinstance(raw, dict) else []
+        if isinstance(raw, list):
+            items = [
+                (e.get("uuid") or e.get("uuidWithoutDashes") or "", e.get("name") or e.get("username") or "")
+                for e in raw
+                if isinstance(e, dict)
+            ]
+        for uuid, name in items:
+            if uuid and name:
+                by_uuid[str(uuid).replace("-", "").lower()] = str(name)
+                by_name[str(name).lower()] = str(uuid)
+        self._by_name, self._by_uuid, self._stamp = by_name, by_uuid, stamp
+
+    def uuid_for(self, name: str) -> str | None:
+        with self._lock:
+            self._refresh()
+            return self._by_name.get(name.lower())
+
+    def name_for(self, uuid: str) -> str | None:
+        with self._lock:
+            self._refresh()
+            return self._by_uuid.get(uuid.replace("-", "").lower())
+
+
+_INDEXES: dict[str, UsernameIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def username_index(path: str) -> UsernameIndex:
+    with _INDEXES_LOCK:
+        idx = _INDEXES.get(path)
+        if idx is None:
+            idx = _INDEXES[path] = UsernameIndex(path)
+        return idx
+
+
+def player_file(playerdata_dir: str, uuid: str) -> str | None:
+    u = uuid.replace("-", "").lower()
+    for cand in (uuid, f"{u[:8]}-{u[8:12]}-{u[12:16]}-{u[16:20]}-{u[20:]}", u):
+        fp = os.path.join(playerdata_dir, f"{cand}.dat")
+        if os.path.isfile(fp):
+            return fp
+    return None
+
+
+# Tailles fixes des charges utiles NBT par type de tag (Byte, Short, Int, Long, Float, Double)
+_FIXED = {1: 1, 2: 2, 3: 4, 4: 8, 5: 4, 6: 8}
+_ARRAY = {7: 1, 11: 4, 12: 8}
+_INT = struct.Struct(">i")
+_USHORT = struct.Struct(">H")
+_DOUBLE3 = struct.Struct(">3d")
+
+
+def _read_exact(f, n: int) -> bytes:
+    b = f.read(n)
+    if len(b) != n:
+        raise ValueError("NBT tronqué")
+    return b
+
+
+def _read_name(f) -> bytes:
+    return _read_exact(f, _USHORT.unpack(_read_exact(f, 2))[0])
+
+
+def _skip(f, tag: int) -> None:
+    if tag in _FIXED:
+        _read_exact(f, _FIXED[tag])
+    elif tag in _ARRAY:
+        _read_exact(f, _INT.unpack(_read_exact(f, 4))[0] * _ARRAY[tag])
+    elif tag == 8:
+        _read_name(f)
+    elif tag == 9:
+        inner = _read_exact(f, 1)[0]
+        n = _INT.unpack(_read_exact(f, 4))[0]
+        if inner in _FIXED:
+            _read_exact(f, n * _FIXED[inner])
+        else:
+            for _ in range(max(0, n)):
+                _skip(f, inner)
+    elif tag == 10:
+        while True:
+            t = _read_exact(f, 1)[0]
+            if t == 0:
+                return
+            _read_name(f)
+            _skip(f, t)
+    else:
+        raise ValueError(f"tag NBT inconnu : {tag}")
+
+
+def read_pos_dim(fp: str) -> tuple[str | None, tuple[float, float, float] | None]:
+    # Parcours en flux du compound racine : les autres tags sont sautés sans être décodés et la
+    # lecture s'arrête dès que Pos et Dimension sont trouvés
+    dim = pos = None
+    with gzip.open(fp, "rb") as f:
+        if _read_exact(f, 1)[0] != 10:
+            raise ValueError("racine NBT inattendue")
+        _read_name(f)
+        while dim is None or pos is None:
+            t = _read_exact(f, 1)[0]
+            if t == 0:
+                break
+            name = _read_name(f)
+            if name == b"Pos" and t == 9:
+                inner = _read_exact(f, 1)[0]
+                n = _INT.unpack(_read_exact(f, 4))[0]
+                if inner == 6 and n == 3:
+                    pos = _DOUBLE3.unpack(_read_exact(f, 24))
+                else:
+                    _read_exact(f, n * _FIXED.get(inner, 0))
+            elif name == b"Dimension" and t == 8:
+                dim = _read_name(f).decode("utf-8", errors="replace")
+            elif name == b"Dimension" and t == 3:
+                dim = {0: "minecraft:overworld", -1: "minecraft:the_nether", 1: "minecraft:the_end"}.get(
+                    _INT.unpack(_read_exact(f, 4))[0]
+                )
+            else:
+                _skip(f, t)
+    return dim, pos
+
+
 def read_file(fp):
+    import nbtlib
+
     nbt_obj = nbtlib.load(fp)
     data = nbt_obj.unpack()
     filtered = {k: v for k, v in data.items() if k in FIELDS}
@@ -69,7 +214,7 @@ def format_player(p: dict, names: dict) -> str:
     gm = GAMEMODES.get(p.get("playerGameType", -1), str(p.get("playerGameType")))
     seen = "✓" if p.get("seenCredits", 0) else "✗"
     pos = p.get("Pos", [0, 0, 0])
-    if isinstance(pos, np.ndarray):
+    if hasattr(pos, "tolist"):
         pos = pos.tolist()
     pos_str = f"X={pos[0]:.1f} Y={pos[1]:.1f} Z={pos[2]:.1f}"
     return (
@@ -116,29 +261,13 @@ def main():
     names = load_usernames(args.usernamecache)
 
     if args.dims_json:
-
-        def _name_from_uuid(uuid, names):
-            if isinstance(names, dict):
-                return names.get(uuid) or names.get(uuid.replace("-", ""))
-            if isinstance(names, list):
-                for ent in names:
-                    if isinstance(ent, dict):
-                        k = (ent.get("uuid") or ent.get("uuidWithoutDashes") or "").replace("-", "").lower()
-                        if k == uuid.replace("-", "").lower():
-                            return ent.get("name") or ent.get("username")
-            return None
-
+        index = username_index(args.usernamecache)
         out = {}
         for fp in files:
             uuid = os.path.splitext(os.path.basename(fp))[0]
-            name = _name_from_uuid(uuid, names) or uuid
+            name = index.name_for(uuid) or uuid
             try:
-                pdat = read_file(fp)
-                dim = pdat.get("Dimension")
-                if hasattr(dim, "value"):
-                    dim = dim.value
-                if isinstance(dim, int):
-                    dim = {0: "minecraft:overworld", -1: "minecraft:the_nether", 1: "minecraft:the_end"}.get(dim)
+                dim, _ = read_pos_dim(fp)
                 if name and dim:
                     out[name] = dim
             except Exception:
@@ -0,0 +1,179 @@
+import os
+import queue
+import threading
+import time
+
+from chat_logs import LogTail, parse_join_leave
+from scheduler import REASON_OFFLINE, REASON_RCON
+
+
+class PresenceTail(threading.Thread):
+    def __init__(self, path: str, on_event):
+        super().__init__(name="presence-tail", daemon=True)
+        self.path = path
+        self.on_event = on_event
+        self._stop_evt = threading.Event()
+
+    def run(self):
+        tail = LogTail(self.path)
+        # Seuls les événements à venir comptent : on démarre en fin de fichier
+        tail.preloaded = True
+        tail.force_refresh()
+        for line in tail.follow(self._stop_evt):
+            ev = parse_join_leave(line)
+            if ev:
+                self.on_event(ev[2], ev[1])
+
+    def stop(self):
+        self._stop_evt.set()
+
+
+# Reprise automatique d'une pause due au joueur absent ou au RCON coupé, pilotée par les
+# connexions/déconnexions lues dans latest.log et les événements de RconClient. Aucune commande
+# de sondage : seules des reconnexions RCON sont tentées, avec un délai qui double à chaque échec.
+class AutoResume(threading.Thread):
+    def __init__(
+        self,
+        sched,
+        rcon,
+        player: str,
+        log_path: str = "",
+        grace_s: float = 5.0,
+        backoff_max_s: float = 300.0,
+        on_resume=None,
+    ):
+        super().__init__(name="auto-resume", daemon=True)
+        self.sched = sched
+        self.rcon = rcon
+        self.player = player.lower()
+        self.grace_s = grace_s
+        self.backoff_max_s = backoff_max_s
+        self.on_resume = on_resume
+        self.online: bool | None = None
+        self.link_ok = True
+        self.failures = 0
+        self._resumed = False
+        self._resume_at: float | None = None
+        self._reconnect_at: float | None = None
+        self._q: queue.Queue = queue.Queue()
+        self._stop_evt = threading.Event()
+        self.presence = None
+        if log_path and os.path.isfile(log_path):
+            self.presence = PresenceTail(log_path, lambda kind, name: self._q.put((kind, name)))
+
+    @staticmethod
+    def from_config(sched, rcon, cfg, on_resume=None):
+        ar = cfg.auto_resume
+        if not ar.enabled:
+            return None
+        return AutoResume(
+            sched,
+            rcon,
+            cfg.exploration.player,
+            cfg.chat.log_path,
+            grace_s=ar.grace_s,
+            backoff_max_s=ar.backoff_max_s,
+            on_resume=on_resume,
+        )
+
+    def _delay(self) -> float:
+        return min(self.backoff_max_s, self.grace_s * (2**self.failures))
+
+    def _on_sched(self, event: str, data):
+        self._q.put((event, data))
+
+    def _on_rcon(self, event: str):
+        self._q.put((event, None))
+
+    def start(self):
+        self.sched.listeners.append(self._on_sched)
+        self.rcon.add_listener(self._on_rcon)
+        if self.presence is not None:
+            self.presence.start()
+        super().start()
+        return self
+
+    def stop(self):
+        self._stop_evt.set()
+        self._q.put(("stop", None))
+        if self.presence is not None:
+            self.presence.stop()
+        try:
+            self.sched.listeners.remove(self._on_sched)
+        except ValueError:
+            pass
+        self.rcon.remove_listener(self._on_rcon)
+
+    # Seules les pauses liées au joueur ou au RCON se lèvent seules ; une sauvegarde en échec attend l'opérateur
+    def _auto_paused(self) -> bool:
+        return self.sched.paused and self.sched.auto_reason in (REASON_OFFLINE, REASON_RCON)
+
+    def _schedule_resume(self, delay: float):
+        at = time.monotonic() + delay
+        if self._resume_at is None or at < self._resume_at:
+            self._resume_at = at
+
+    def _handle(self, kind: str, data):
+        if kind in ("join", "leave"):
+            if str(data).lower() != self.player:
+                return
+            self.online = kind == "join"
+            if not self.online:
+                self._resume_at = None
+                if not self.sched.paused:
+                    self.sched.auto_pause(REASON_OFFLINE)
+            elif self._auto_paused() and self.link_ok:
+                # Laisser le temps au joueur de finir de charger avant le prochain TP
+                self._schedule_resume(self._delay())
+        elif kind == "pause":
+            if self._resumed:
+                self.failures += 1
+                self._resumed = False
+            if data == REASON_RCON:
+                self.link_ok = False
+                self._reconnect_at = time.monotonic() + self._delay()
+            elif data == REASON_OFFLINE and self.online is not False and self.presence is None:
+                # Sans latest.log, le TP suivant sert de test, espacé par le délai exponentiel
+                self._schedule_resume(self._delay())
+        elif kind == "tp":
+            self.failures = 0
+            self._resumed = False
+        elif kind == "disconnected":
+            self.link_ok = False
+        elif kind == "connected":
+            self.link_ok = True
+            self._reconnect_at = None
+            if self._auto_paused() and self.online is not False:
+                self._schedule_resume(0.0)
+
+    def _tick(self):
+        now = time.monotonic()
+        if self._reconnect_at is not None and now >= self._reconnect_at:
+            self._reconnect_at = None
+            try:
+                self.rcon.close()
+                self.rcon.connect()
+            except Exception:
+                self.failures += 1
+                self._reconnect_at = time.monotonic() + self._delay()
+        if self._resume_at is not None and now >= self._resume_at:
+            self._resume_at = None
+            if self._auto_paused() and self.link_ok and self.online is not False:
+                self._resumed = True
+                self.sched.resume()
+                if self.on_resume is not None:
+                    self.on_resume()
+
+    def run(self):
+        while not self._stop_evt.is_set():
+            pending = [t for t in (self._resume_at, self._reconnect_at) if t is not None]
+            timeout = max(0.0, min(pending) - time.monotonic()) if pending else None
+            try:
+                kind, data = self._q.get(timeout=timeout)
+            except queue.Empty:
+                kind = None
+            if kind == "stop":
+                return
+            if kind is not None:
+                self._handle(kind, data)
+            self._tick()
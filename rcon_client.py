@@ -1,3 +1,7 @@
+import time
+
+import metrics
+
 try:
     from mcrcon import MCRcon
 except Exception:
@@ -12,6 +16,23 @@ class RconClient:
         self.timeout = float(timeout)
         self.conn: MCRcon | None = None
         self.dry_run = dry_run
+        self._listeners = []
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def remove_listener(self, fn):
+        try:
+            self._listeners.remove(fn)
+        except ValueError:
+            pass
+
+    def _notify(self, event: str):
+        for fn in list(self._listeners):
+            try:
+                fn(event)
+            except Exception:
+                pass
 
     def connect(self):
         if self.dry_run:
@@ -20,6 +41,7 @@ class RconClient:
             raise RuntimeError("Le module 'mcrcon' est introuvable. Installez-le avec: pip install mcrcon")
         self.conn = MCRcon(self.host, self.password, port=self.port)
         self.conn.connect()
+        self._notify("connected")
 
     def close(self):
         if self.conn is not None:
@@ -30,14 +52,28 @@ class RconClient:
             self.conn = None
 
     def cmd(self, command: str) -> str:
+        metrics.RCON_COMMANDS.inc()
         if self.dry_run:
             return f"[DRY-RUN] {command}"
+        t0 = time.monotonic()
+        try:
+            return self._cmd(command)
+        except Exception:
+            metrics.RCON_ERRORS.inc()
+            self.close()
+            self._notify("disconnected")
+            raise
+        finally:
+            metrics.RCON_SECONDS.observe(time.monotonic() - t0)
+
+    def _cmd(self, command: str) -> str:
         if not self.conn:
             self.connect()
         try:
             assert self.conn is not None
             return self.conn.command(command)
         except Exception:
+            metrics.RCON_RECONNECTS.inc()
             self.close()
             self.connect()
             assert self.conn is not None
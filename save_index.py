@@ -0,0 +1,167 @@
+import glob
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any
+
+try:
+    import fcntl
+except Exception:
+    fcntl = None
+
+from config import _dim_short, _slug_player
+
+INDEX_NAME = "index"
+SAVE_PATTERNS = ("*.json", "*.spr")
+
+
+# Le serveur RCON entre dans la clé comme dans le hash du nom de fichier : seuls l'intervalle et le /tp max
+# en sont exclus, pour qu'un réglage à chaud retrouve la même sauvegarde sans jamais changer de serveur
+def save_key(player: str, dimension: str, chunks: int, spawn_x: int, spawn_z: int, y: int, server: str) -> str:
+    p = _slug_player(str(player)).lower()
+    return f"{p}-{_dim_short(str(dimension))}-c{int(chunks)}-sx{int(spawn_x)}-sz{int(spawn_z)}-y{int(y)}@{server}"
+
+
+def server_from_conf(conf: dict[str, Any]) -> str:
+    return f"{conf['rcon']['host']}:{int(conf['rcon']['port'])}"
+
+
+def save_key_from_conf(conf: dict[str, Any]) -> str:
+    e = conf["exploration"]
+    server = server_from_conf(conf)
+    return save_key(e["player"], e["dimension"], e["chunks"], e["spawn_x"], e["spawn_z"], e["y"], server)
+
+
+# L'état sauvegardé garde l'hôte et le port RCON de sa création : une entrée reconstruite par scan a son serveur
+def save_key_from_state(state) -> str:
+    server = f"{state.host}:{int(state.port)}"
+    return save_key(state.player, state.dimension, state.chunk_step, state.spawn_x, state.spawn_z, state.y, server)
+
+
+class SaveIndex:
+    def __init__(self, save_dir: str):
+        self.save_dir = save_dir or "."
+        self.path = os.path.join(self.save_dir, INDEX_NAME)
+        self.entries: dict[str, dict] = {}
+        self.latest: dict[str, str] = {}
+        self._mtime: float | None = None
+
+    def load(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self.rebuild()
+            return self
+        if self._mtime == st.st_mtime:
+            return self
+        if not self._read():
+            self.rebuild()
+        return self
+
+    def _read(self) -> bool:
+        try:
+            mtime = os.stat(self.path).st_mtime
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.entries = dict(data.get("saves", {}))
+            self.latest = dict(data.get("latest", {}))
+            self._mtime = mtime
+            return True
+        except (OSError, ValueError, AttributeError):
+            return False
+
+    def _scan(self):
+        from state import SaveManager
+
+        self.entries = {}
+        self.latest = {}
+        files = []
+        for pat in SAVE_PATTERNS:
+            files.extend(glob.glob(os.path.join(self.save_dir, pat)))
+        for fp in files:
+            try:
+                st = SaveManager(fp).load()
+            except Exception:
+                continue
+            self._put(fp, st, os.path.getmtime(fp))
+
+    def rebuild(self):
+        with self._locked():
+            # Un autre écrivain a pu recréer l'index pendant l'attente du verrou
+            if not self._read():
+                self._scan()
+                self._write()
+
+    # Verrou exclusif sur index.lock le temps d'une lecture-modification-écriture : sessions concurrentes et
+    # workers de jobs du même processus ne perdent plus d'entrées
+    @contextmanager
+    def _locked(self):
+        os.makedirs(self.save_dir, exist_ok=True)
+        with open(self.path + ".lock", "a") as lf:
+            if fcntl is not None:
+                fcntl.flock(lf.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lf.fileno(), fcntl.LOCK_UN)
+
+    def update(self, path: str, state):
+        with self._locked():
+            # Relecture forcée sous verrou : le cache par mtime peut masquer une écriture de la même seconde
+            if not self._read():
+                self._scan()
+            self._put(path, state, time.time())
+            self._write()
+
+    def lookup(self, key: str) -> str | None:
+        path = self.latest.get(key)
+        if path and os.path.isfile(path):
+            return path
+        return None
+
+    def list(self) -> list[dict]:
+        return sorted(self.entries.values(), key=lambda e: e.get("mtime", 0), reverse=True)
+
+    def write(self):
+        with self._locked():
+            self._write()
+
+    def _write(self):
+        fd, tmp = tempfile.mkstemp(prefix=INDEX_NAME + ".", suffix=".tmp", dir=self.save_dir)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "saves": self.entries, "latest": self.latest}, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        try:
+            self._mtime = os.path.getmtime(self.path)
+        except OSError:
+            self._mtime = None
+
+    def _put(self, path: str, state, mtime: float):
+        key = save_key_from_state(state)
+        self.entries[path] = {
+            "key": key,
+            "path": path,
+            "player": state.player,
+            "dimension": state.dimension,
+            "chunks": state.chunk_step,
+            "spawn_x": state.spawn_x,
+            "spawn_z": state.spawn_z,
+            "y": state.y,
+            "step": state.step_index,
+            "max_tps": state.max_tps,
+            "server": f"{state.host}:{int(state.port)}",
+            "mtime": mtime,
+        }
+        cur = self.latest.get(key)
+        if cur is None or cur == path or self.entries.get(cur, {}).get("mtime", 0) <= mtime:
+            self.latest[key] = path
@@ -0,0 +1,343 @@
+import queue
+import re
+import threading
+import time
+from dataclasses import dataclass, replace
+
+import metrics
+from spiral import next_step
+from state import SaveManager, SpiralState
+
+
+@dataclass(frozen=True, slots=True)
+class TPEvent:
+    step: int
+    x: int
+    y: int
+    z: int
+    resp: str
+    latency: float
+    issue: str | None
+    t0: float = 0.0
+    state: SpiralState | None = None
+    line: object = None
+
+
+TELEPORTED_RE = re.compile(
+    r"^Teleported\s+.+?\s+to\s+([+-]?\d+(?:\.\d+)?),\s*([+-]?\d+(?:\.\d+)?),\s*([+-]?\d+(?:\.\d+)?)\s*$",
+    re.IGNORECASE,
+)
+
+OFFLINE_PATTERNS = [
+    "no entity",
+    "entity not found",
+    "player not found",
+    "cannot be found",
+    "no player was found",
+    "is not online",
+    "no targets matched",
+]
+
+
+REASON_RCON = "RCON indisponible"
+REASON_OFFLINE = "joueur introuvable"
+
+
+def _looks_offline_or_error(resp: str) -> str | None:
+    r = resp or ""
+    r_low = r.lower()
+    if r.startswith("ERREUR RCON"):
+        return REASON_RCON
+    for p in OFFLINE_PATTERNS:
+        if p in r_low:
+            return REASON_OFFLINE
+    return None
+
+
+PIPELINE_DEPTH = 8
+
+
+# Un étage du pipeline TP : lit sa file d'entrée bornée et pousse le résultat dans la suivante.
+# Une file pleine bloque l'étage précédent, ce qui freine l'envoi au lieu d'accumuler du retard.
+class _Stage(threading.Thread):
+    def __init__(self, name: str, fn, inbox: queue.Queue, outbox: queue.Queue, forward_end: bool = True):
+        super().__init__(name=name, daemon=True)
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.forward_end = forward_end
+
+    def run(self):
+        while True:
+            item = self.inbox.get()
+            metrics.QUEUE_DEPTH.set(self.inbox.qsize(), stage=self.name)
+            if item is None:
+                if self.forward_end:
+                    self.outbox.put(None)
+                return
+            try:
+                item = self.fn(item)
+            except Exception:
+                # Un étage défaillant ne doit pas bloquer la chaîne : l'événement passe tel quel
+                pass
+            self.outbox.put(item)
+
+
+# Échéances à cadence fixe sur l'horloge monotone : la latence RCON et la sauvegarde ne décalent
+# pas les TP suivants. Après un blocage, au plus max_catchup TP en retard partent d'affilée.
+class TPScheduler(threading.Thread):
+    def __init__(
+        self,
+        state: SpiralState,
+        save: SaveManager,
+        rcon,
+        history=None,
+        max_catchup: int = 1,
+        stop_at: float | None = None,
+        formatter=None,
+        throttle=None,
+        verifier=None,
+    ):
+        super().__init__(daemon=True)
+        if state.step_index == 0 and (state.current_x, state.current_z) == (0, 0):
+            state.current_x = state.spawn_x
+            state.current_z = state.spawn_z
+        self.state = state
+        self.save = save
+        self.rcon = rcon
+        self.history = history
+        self.max_catchup = max(0, int(max_catchup))
+        self.stop_at = stop_at
+        self.events: queue.Queue = queue.Queue()
+        self.paused = False
+        self.auto_reason: str | None = None
+        self.next_due = time.monotonic() + state.interval_s
+        metrics.TP_INTERVAL.set(state.interval_s)
+        metrics.PAUSED.set(0)
+        self.result: str | None = None
+        self._cond = threading.Condition()
+        self._force = False
+        self._stopping = False
+        self.formatter = formatter
+        self.throttle = throttle
+        self.verifier = verifier
+        self._unchecked: tuple[int, int, int] | None = None
+        # Abonnés (événement, donnée) : ("pause", motif) et ("tp", TPEvent) pour un TP réussi
+        self.listeners = []
+        # dispatch -> vérification -> persistance -> journal -> events (consommée par l'affichage)
+        self._dispatched: queue.Queue = queue.Queue(maxsize=PIPELINE_DEPTH)
+        verified: queue.Queue = queue.Queue(maxsize=PIPELINE_DEPTH)
+        persisted: queue.Queue = queue.Queue(maxsize=PIPELINE_DEPTH)
+        self._stages = [
+            _Stage("tp-verify", self._verify, self._dispatched, verified),
+            _Stage("tp-persist", self._persist, verified, persisted),
+            _Stage("tp-log", self._log, persisted, self.events, forward_end=False),
+        ]
+
+    def toggle_pause(self):
+        with self._cond:
+            self.paused = not self.paused
+            metrics.PAUSED.set(1 if self.paused else 0)
+            if not self.paused:
+                self.auto_reason = None
+                self.next_due = time.monotonic() + self.state.interval_s
+            self._cond.notify()
+
+    def resume(self):
+        with self._cond:
+            if self.paused:
+                self.toggle_pause()
+
+    def request_next(self):
+        with self._cond:
+            self._force = True
+            self._cond.notify()
+
+    def retune(self, interval_s: float):
+        if self.throttle is not None:
+            # Nouvel intervalle de base : la régulation MSPT reste appliquée par-dessus
+            self.throttle.base_s = interval_s
+            interval_s = self.throttle.interval()
+        self._set_interval(interval_s)
+
+    def _set_interval(self, interval_s: float):
+        with self._cond:
+            if interval_s != self.state.interval_s:
+                self.next_due += interval_s - self.state.interval_s
+                self.state.interval_s = interval_s
+                metrics.TP_INTERVAL.set(interval_s)
+                self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+
+    def _wait_due(self) -> str | None:
+        with self._cond:
+            while not self._stopping:
+                if self.stop_at is not None and time.time() >= self.stop_at:
+                    return "WINDOW"
+                if self._force or (not self.paused and time.monotonic() >= self.next_due):
+                    return "TP"
+                if self.throttle is not None and not self.paused and time.monotonic() >= self.throttle.next_sample:
+                    return "SAMPLE"
+                timeout = None if self.paused else self.next_due - time.monotonic()
+                if self.throttle is not None and not self.paused:
+                    timeout = min(timeout, self.throttle.next_sample - time.monotonic())
+                if self.stop_at is not None:
+                    left = self.stop_at - time.time()
+                    timeout = left if timeout is None else min(timeout, left)
+                self._cond.wait(timeout)
+            return None
+
+    def _advance(self, forced: bool):
+        now = time.monotonic()
+        interval = self.state.interval_s
+        if forced:
+            self.next_due = now + interval
+            return
+        self.next_due += interval
+        missed = int((now - self.next_due) // interval) + 1 if now >= self.next_due else 0
+        if missed > self.max_catchup:
+            self.next_due += (missed - self.max_catchup) * interval
+
+    def _notify(self, event: str, data):
+        for fn in list(self.listeners):
+            try:
+                fn(event, data)
+            except Exception:
+                pass
+
+    def auto_pause(self, reason: str):
+        with self._cond:
+            self.paused = True
+            self.auto_reason = reason
+            # Un TP forcé demandé avant l'échec ne part pas ; N reste possible pendant la pause
+            self._force = False
+        metrics.PAUSED.set(1)
+        metrics.PAUSES.inc(reason=reason)
+        self._notify("pause", reason)
+
+    def _verify(self, ev: TPEvent) -> TPEvent:
+        metrics.TP_TOTAL.inc()
+        metrics.TP_LATENCY.observe(ev.latency)
+        metrics.TP_STEP.set(ev.step)
+        metrics.TP_LAST.set(time.time())
+        if ev.issue:
+            metrics.TP_ERRORS.inc(reason=ev.issue)
+        else:
+            self._notify("tp", ev)
+        return ev
+
+    def _persist(self, ev: TPEvent) -> TPEvent:
+        if self.history is not None:
+            try:
+                self.history.append(ev.step, ev.t0, ev.x, ev.y, ev.z, ev.resp, ev.latency)
+            except OSError:
+                pass
+        try:
+            self.save.save(ev.state)
+        except OSError as e:
+            issue = f"sauvegarde impossible : {e}"
+            self.auto_pause(issue)
+            return replace(ev, state=None, issue=issue)
+        return replace(ev, state=None)
+
+    def _log(self, ev: TPEvent) -> TPEvent:
+        if self.formatter is not None:
+            try:
+                return replace(ev, line=self.formatter(ev))
+            except Exception:
+                # Ligne de secours : l'affichage ne doit jamais recevoir un TP sans ligne
+                return replace(ev, line=f"TP {ev.step} → X={ev.x} Y={ev.y} Z={ev.z}")
+        return ev
+
+    def _check_last(self):
+        if self.verifier is None or self._unchecked is None:
+            return
+        step, x, z = self._unchecked
+        self._unchecked = None
+        self.verifier.check(self.rcon, self.state.dimension, self.state.y, step, x, z)
+
+    # La pause est décidée ici, dans le thread de l'ordonnanceur : aucun TP de rattrapage ni TP forcé ne part
+    # après un échec en attendant que le pipeline l'ait traité
+    def _send(self, step: int, x: int, z: int) -> str | None:
+        state = self.state
+        cmd = f"execute in {state.dimension} run tp {state.player} {x} {state.y} {z}"
+        t0 = time.monotonic()
+        try:
+            resp = self.rcon.cmd(cmd)
+        except Exception as e:
+            resp = f"ERREUR RCON : {e}"
+        latency = time.monotonic() - t0
+        issue = _looks_offline_or_error(resp)
+        if issue:
+            self.auto_pause(issue)
+        # Copie de l'état : les étages suivants ne voient jamais le TP d'après
+        self._dispatched.put(TPEvent(step, x, state.y, z, resp, latency, issue, t0, replace(state)))
+        return issue
+
+    # Fin de run : chaque TP en défaut est rejoué, au plus verifier.attempts fois d'une exécution à l'autre ; la
+    # file restante est conservée à côté de la sauvegarde pour la prochaine exécution
+    def _retry_pass(self):
+        v = self.verifier
+        if v is None:
+            return
+        v.audit(self.rcon, self.state)
+        sent = []
+        for p in list(v.pending):
+            if self._stopping or self.paused:
+                break
+            if self._send(p["step"], p["x"], p["z"]):
+                break
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopping, v.settle_s)
+            if self._stopping:
+                return
+            if v.method == "region":
+                sent.append(p)
+            else:
+                v.settle(p, v.probe(self.rcon, self.state.dimension, self.state.y, p["x"], p["z"]))
+        v.settle_regions(self.rcon, self.state.dimension, sent)
+
+    def run(self):
+        state = self.state
+        for st in self._stages:
+            st.start()
+        try:
+            while True:
+                what = self._wait_due()
+                if what is None:
+                    return
+                if what == "WINDOW":
+                    self.result = "WINDOW"
+                    return
+                if what == "SAMPLE":
+                    # Même thread que les TP : les requêtes RCON ne se croisent jamais
+                    self._set_interval(self.throttle.sample(self.rcon))
+                    continue
+                self._check_last()
+                if state.max_tps is not None and state.max_tps >= 0 and state.step_index >= state.max_tps:
+                    self._retry_pass()
+                    self.result = "DONE"
+                    return
+                with self._cond:
+                    forced = self._force
+                    self._force = False
+                x, z, _ = next_step(state)
+                issue = self._send(state.step_index, x, z)
+                with self._cond:
+                    self._advance(forced)
+                if self.verifier is not None:
+                    if issue:
+                        # TP non effectué : la spirale avance quand même, la zone est à reprendre
+                        self.verifier.add(state.step_index, x, z)
+                    else:
+                        self._unchecked = (state.step_index, x, z)
+        finally:
+            self._dispatched.put(None)
+            for st in self._stages:
+                st.join()
+            self.save.save(state, force=True)
+            self.events.put(None)
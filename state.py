@@ -1,9 +1,81 @@
+#!/usr/bin/env python3
+import argparse
 import json
 import os
-from dataclasses import asdict, dataclass
+import socket
+import struct
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, fields, replace
 
+try:
+    import fcntl
+except Exception:
+    fcntl = None
 
-@dataclass
+JOURNAL_FIELDS = ("step_index", "current_x", "current_z", "dir_idx", "leg_length", "leg_progress")
+JOURNAL_KEYS = ("i", "x", "z", "d", "l", "p")
+COMPACT_EVERY = 500
+# Rafraîchissement du catalogue entre deux compactages : après un arrêt brutal il a au plus ce retard
+INDEX_EVERY_S = 30.0
+SAVE_MODES = ("every_tp", "every_n", "every_ms", "on_exit_only")
+DEFAULT_SAVE_POLICY = {"mode": "every_tp", "every_n": 10, "every_ms": 5000, "fsync": False}
+SAVE_CODECS = ("json", "binary")
+
+# Format binaire v1 : en-tête "<4sBB" (magic, version, drapeaux) puis champs en ordre fixe,
+# chaînes préfixées par leur longueur, entiers en varint zigzag, intervalle en double
+SAVE_MAGIC = b"SPRL"
+SAVE_VERSION = 1
+_HEADER = struct.Struct("<4sBB")
+_DOUBLE = struct.Struct("<d")
+_F_NO_MAX_TPS = 1
+_STR_FIELDS = ("player", "dimension", "host")
+_INT_FIELDS = (
+    "y",
+    "chunk_step",
+    "step_blocks",
+    "spawn_x",
+    "spawn_z",
+    "step_index",
+    "current_x",
+    "current_z",
+    "dir_idx",
+    "leg_length",
+    "leg_progress",
+    "port",
+)
+_JOURNAL_REC = struct.Struct("<6q")
+
+
+def _put_varint(out: bytearray, n: int):
+    n = (n << 1) ^ (n >> 63)
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return
+
+
+def _get_varint(buf: bytes, pos: int) -> tuple[int, int]:
+    n = 0
+    shift = 0
+    while True:
+        if pos >= len(buf):
+            raise ValueError("sauvegarde binaire tronquée")
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if not b & 0x80:
+            break
+        shift += 7
+    return (n >> 1) ^ -(n & 1), pos
+
+
+@dataclass(slots=True)
 class SpiralState:
     player: str = "Yakonche"
     dimension: str = "minecraft:overworld"
@@ -33,20 +105,398 @@ class SpiralState:
             d["step_blocks"] = int(d.get("chunk_step", 32)) * 16
         return SpiralState(**d)
 
+    def to_bytes(self) -> bytes:
+        out = bytearray(_HEADER.pack(SAVE_MAGIC, SAVE_VERSION, _F_NO_MAX_TPS if self.max_tps is None else 0))
+        for f in _STR_FIELDS:
+            raw = str(getattr(self, f)).encode("utf-8")
+            _put_varint(out, len(raw))
+            out += raw
+        for f in _INT_FIELDS:
+            _put_varint(out, int(getattr(self, f)))
+        if self.max_tps is not None:
+            _put_varint(out, int(self.max_tps))
+        out += _DOUBLE.pack(float(self.interval_s))
+        return bytes(out)
 
-class SaveManager:
+    @staticmethod
+    def from_bytes(data: bytes):
+        if len(data) < _HEADER.size:
+            raise ValueError("sauvegarde binaire tronquée")
+        magic, version, flags = _HEADER.unpack_from(data, 0)
+        if magic != SAVE_MAGIC:
+            raise ValueError("pas une sauvegarde binaire")
+        if version > SAVE_VERSION:
+            raise ValueError(f"version de sauvegarde non prise en charge : {version}")
+        pos = _HEADER.size
+        d = {}
+        for f in _STR_FIELDS:
+            n, pos = _get_varint(data, pos)
+            d[f] = data[pos : pos + n].decode("utf-8")
+            pos += n
+        for f in _INT_FIELDS:
+            d[f], pos = _get_varint(data, pos)
+        if flags & _F_NO_MAX_TPS:
+            d["max_tps"] = None
+        else:
+            d["max_tps"], pos = _get_varint(data, pos)
+        if pos + _DOUBLE.size > len(data):
+            raise ValueError("sauvegarde binaire tronquée")
+        (d["interval_s"],) = _DOUBLE.unpack_from(data, pos)
+        return SpiralState(**d)
+
+    @staticmethod
+    def decode(data: bytes):
+        if data.startswith(SAVE_MAGIC):
+            return SpiralState.from_bytes(data)
+        return SpiralState.from_json(data.decode("utf-8"))
+
+
+_ALL_FIELDS = tuple(f.name for f in fields(SpiralState))
+_STATIC_FIELDS = tuple(f for f in _ALL_FIELDS if f not in JOURNAL_FIELDS)
+
+
+def _state_key(state: SpiralState) -> tuple:
+    return tuple(getattr(state, f) for f in _ALL_FIELDS)
+
+
+def _static_fields(state: SpiralState) -> tuple:
+    return tuple(getattr(state, f) for f in _STATIC_FIELDS)
+
+
+def _journal_record(state: SpiralState, binary: bool) -> bytes:
+    vals = [int(getattr(state, f)) for f in JOURNAL_FIELDS]
+    if binary:
+        return _JOURNAL_REC.pack(*vals)
+    return (json.dumps(dict(zip(JOURNAL_KEYS, vals, strict=True)), separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _read_journal(path: str, binary: bool) -> tuple[list[tuple], bool]:
+    records = []
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return records, False
+    with f:
+        data = f.read()
+    if binary:
+        n = len(data) // _JOURNAL_REC.size
+        records = list(_JOURNAL_REC.iter_unpack(data[: n * _JOURNAL_REC.size]))
+        return records, len(data) % _JOURNAL_REC.size != 0
+    for line in data.split(b"\n")[:-1]:
+        try:
+            rec = json.loads(line)
+            records.append(tuple(int(rec[k]) for k in JOURNAL_KEYS))
+        except (ValueError, KeyError):
+            return records, True
+    # Dernière ligne tronquée (arrêt brutal pendant l'écriture)
+    return records, not data.endswith(b"\n") and bool(data)
+
+
+def save_policy_from_conf(conf: dict) -> dict:
+    p = dict(DEFAULT_SAVE_POLICY)
+    p.update(conf.get("save_policy") or {})
+    mode = str(p["mode"])
+    if mode not in SAVE_MODES:
+        raise ValueError(f"save_policy.mode invalide : {mode} (attendu : {', '.join(SAVE_MODES)})")
+    return {
+        "mode": mode,
+        "every_n": max(1, int(p["every_n"])),
+        "every_ms": max(1, int(p["every_ms"])),
+        "fsync": bool(p["fsync"]),
+    }
+
+
+# Extension des noms automatiques (config.compute_save_path) -> format d'écriture
+SAVE_EXT_CODECS = {".json": "json", ".spr": "binary"}
+
+
+def save_codec_from_conf(conf: dict) -> str:
+    codec = str(conf.get("save_format", "json"))
+    if codec not in SAVE_CODECS:
+        raise ValueError(f"save_format invalide : {codec} (attendu : {', '.join(SAVE_CODECS)})")
+    return codec
+
+
+def _fsync_dir(path: str):
+    try:
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class SaveLock:
     def __init__(self, path: str):
+        self.path = path + ".lock"
+        self.fd: int | None = None
+        self.owner: dict | None = None
+        self.stale: dict | None = None
+
+    def read_owner(self) -> dict | None:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = f.read()
+            return json.loads(data) if data.strip() else None
+        except (OSError, ValueError):
+            return None
+
+    def is_stale(self, owner: dict | None) -> bool:
+        if not owner:
+            return True
+        if owner.get("host") != socket.gethostname():
+            return False
+        return not _pid_alive(int(owner.get("pid", -1)))
+
+    def acquire(self) -> bool:
+        if self.fd is not None:
+            return True
+        previous = self.read_owner()
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        locked = False
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                locked = True
+            except BlockingIOError:
+                os.close(fd)
+                self.owner = previous
+                return False
+            except OSError:
+                # Système de fichiers sans flock : on se rabat sur les métadonnées PID/hôte
+                pass
+        if not locked and previous and not self.is_stale(previous) and previous.get("pid") != os.getpid():
+            os.close(fd)
+            self.owner = previous
+            return False
+        # Verrou libre mais métadonnées présentes : la session précédente s'est arrêtée sans nettoyer
+        self.stale = previous if previous else None
+        meta = {"pid": os.getpid(), "host": socket.gethostname(), "since": time.time()}
+        os.ftruncate(fd, 0)
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, json.dumps(meta).encode("utf-8"))
+        self.fd = fd
+        self.owner = meta
+        return True
+
+    def release(self):
+        if self.fd is None:
+            return
+        try:
+            os.ftruncate(self.fd, 0)
+            if fcntl is not None:
+                fcntl.flock(self.fd, fcntl.LOCK_UN)
+        except OSError:
+            pass
+        finally:
+            os.close(self.fd)
+            self.fd = None
+
+
+# Instantané JSON complet + journal d'étapes en ajout seul, compacté toutes les `compact_every` entrées
+class SaveManager:
+    def __init__(
+        self, path: str, compact_every: int = COMPACT_EVERY, policy: dict | None = None, index=None, codec: str = "json"
+    ):
         self.path = path
+        self.codec = codec
+        self.index = index
+        self.journal_path = path + ".journal"
+        self.compact_every = max(1, int(compact_every))
+        self.policy = dict(DEFAULT_SAVE_POLICY, **(policy or {}))
+        self._base: tuple | None = None
+        self._journal_binary = codec == "binary"
+        self._journal_len = 0
+        self._lock = threading.Lock()
+        self._last_key: tuple | None = None
+        self._pending: SpiralState | None = None
+        self._pending_n = 0
+        self._stop = threading.Event()
+        self._flusher: threading.Thread | None = None
+        self._last_state: SpiralState | None = None
+        self._index_due = 0.0
+        self.lock = SaveLock(path)
+        self.read_only = False
 
     def exists(self):
         return os.path.isfile(self.path)
 
+    def acquire(self) -> bool:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.read_only = not self.lock.acquire()
+        return not self.read_only
+
+    def lock_owner(self) -> dict | None:
+        return self.lock.owner
+
+    def mtime_key(self) -> tuple:
+        out = []
+        for p in (self.path, self.journal_path):
+            try:
+                st = os.stat(p)
+                out.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                out.append(None)
+        return tuple(out)
+
     def load(self):
-        with open(self.path, encoding="utf-8") as f:
-            return SpiralState.from_json(f.read())
+        with open(self.path, "rb") as f:
+            data = f.read()
+        state = SpiralState.decode(data)
+        self._journal_binary = data.startswith(SAVE_MAGIC)
+        self._base = _static_fields(state)
+        base_step = state.step_index
+        records, torn = _read_journal(self.journal_path, self._journal_binary)
+        for rec in records:
+            # Les entrées antérieures à l'instantané proviennent d'un compactage interrompu
+            if rec[0] <= base_step:
+                continue
+            for f, v in zip(JOURNAL_FIELDS, rec, strict=True):
+                setattr(state, f, v)
+        # Un journal abîmé, ou d'un autre format que celui configuré, est réécrit à la prochaine sauvegarde
+        rewrite = torn or self._journal_binary != (self.codec == "binary")
+        self._journal_len = self.compact_every if rewrite else len(records)
+        self._last_key = None if rewrite else _state_key(state)
+        return state
+
+    def save(self, state: SpiralState, force: bool = False):
+        if self.read_only:
+            return
+        with self._lock:
+            if _state_key(state) == self._last_key:
+                self._pending = None
+                self._pending_n = 0
+                return
+            mode = self.policy["mode"]
+            if force or mode == "every_tp":
+                self._write(state)
+                return
+            self._pending = replace(state)
+            self._pending_n += 1
+            if mode == "every_n" and self._pending_n >= int(self.policy["every_n"]):
+                self._write(self._pending)
+                return
+            if mode == "every_ms":
+                self._start_flusher()
+
+    def flush(self):
+        if self.read_only:
+            return
+        with self._lock:
+            if self._pending is not None:
+                self._write(self._pending)
+
+    def close(self, state: SpiralState | None = None):
+        self._stop.set()
+        # Join hors du verrou : le flusher peut l'attendre dans flush()
+        with self._lock:
+            flusher, self._flusher = self._flusher, None
+        if flusher is not None:
+            flusher.join(timeout=2.0)
+        if state is not None:
+            self.save(state, force=True)
+        else:
+            self.flush()
+        if not self.read_only:
+            self._update_index()
+        self.lock.release()
+
+    def compact(self, state: SpiralState):
+        with self._lock:
+            self._compact(state)
+            self._last_key = _state_key(state)
+
+    # Appelé sous self._lock : deux save() concurrents ne lancent qu'un seul flusher
+    def _start_flusher(self):
+        if self._flusher is not None or self._stop.is_set():
+            return
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
 
-    def save(self, state: SpiralState):
+    def _flush_loop(self):
+        delay = int(self.policy["every_ms"]) / 1000.0
+        while not self._stop.wait(delay):
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def _write(self, state: SpiralState):
+        if self._base != _static_fields(state) or self._journal_len >= self.compact_every:
+            self._compact(state)
+        else:
+            created = not os.path.exists(self.journal_path)
+            with open(self.journal_path, "ab") as f:
+                f.write(_journal_record(state, self._journal_binary))
+                if self.policy["fsync"]:
+                    f.flush()
+                    os.fsync(f.fileno())
+            if created and self.policy["fsync"]:
+                _fsync_dir(self.journal_path)
+            self._journal_len += 1
+        self._last_key = _state_key(state)
+        self._last_state = state
+        self._pending = None
+        self._pending_n = 0
+        if time.monotonic() >= self._index_due:
+            self._update_index()
+
+    def _compact(self, state: SpiralState):
         tmp = self.path + ".tmp"
-        with open(tmp, "w", encoding="utf-8") as f:
-            f.write(state.to_json())
+        binary = self.codec == "binary"
+        with open(tmp, "wb") as f:
+            f.write(state.to_bytes() if binary else state.to_json().encode("utf-8"))
+            if self.policy["fsync"]:
+                f.flush()
+                os.fsync(f.fileno())
         os.replace(tmp, self.path)
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
+        if self.policy["fsync"]:
+            _fsync_dir(self.path)
+        self._journal_binary = binary
+        self._base = _static_fields(state)
+        self._journal_len = 0
+        self._last_state = state
+        self._update_index()
+
+    def _update_index(self):
+        if self.index is None or self._last_state is None:
+            return
+        self._index_due = time.monotonic() + INDEX_EVERY_S
+        try:
+            self.index.update(self.path, self._last_state)
+        except (OSError, ValueError):
+            pass
+
+
+def main():
+    p = argparse.ArgumentParser(description="Export JSON lisible d'une sauvegarde (instantané + journal)")
+    p.add_argument("path")
+    args = p.parse_args()
+    if not os.path.isfile(args.path):
+        print("fichier introuvable", file=sys.stderr)
+        sys.exit(1)
+    print(SaveManager(args.path).load().to_json())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import re
+import time
+
+_COLOR_RE = re.compile(r"§.")
+_TICK_QUERY_RE = re.compile(r"Average time per tick:\s*([\d.]+)\s*ms", re.IGNORECASE)
+_FORGE_OVERALL_RE = re.compile(r"Overall\s*:.*?Mean tick time:\s*([\d.]+)\s*ms", re.IGNORECASE | re.DOTALL)
+_FORGE_RE = re.compile(r"Mean tick time:\s*([\d.]+)\s*ms", re.IGNORECASE)
+_SPARK_RE = re.compile(r"([\d.]+)/([\d.]+)/([\d.]+)/([\d.]+)")
+_PAPER_RE = re.compile(r"([\d.]+)/([\d.]+)/([\d.]+)")
+
+# Au-dessus de la cible on ralentit ; sous LOW_RATIO × cible on revient vers l'intervalle configuré
+LOW_RATIO = 0.75
+MAX_STEP = 2.0
+RELAX = 0.85
+
+
+def _clean(resp: str) -> str:
+    return _COLOR_RE.sub("", resp or "")
+
+
+def parse_tick_query(resp: str) -> float | None:
+    m = _TICK_QUERY_RE.search(_clean(resp))
+    return float(m.group(1)) if m else None
+
+
+def parse_forge_tps(resp: str) -> float | None:
+    r = _clean(resp)
+    m = _FORGE_OVERALL_RE.search(r) or _FORGE_RE.search(r)
+    return float(m.group(1)) if m else None
+
+
+def parse_spark_tps(resp: str) -> float | None:
+    r = _clean(resp)
+    if "tick durations" not in r.lower():
+        return None
+    # min/med/95%ile/max sur la fenêtre la plus courte : on suit la médiane
+    m = _SPARK_RE.search(r)
+    return float(m.group(2)) if m else None
+
+
+def parse_paper_mspt(resp: str) -> float | None:
+    r = _clean(resp)
+    if "tick times" not in r.lower():
+        return None
+    # avg/min/max sur les 5 dernières secondes
+    m = _PAPER_RE.search(r)
+    return float(m.group(1)) if m else None
+
+
+MSPT_PROBES: list[tuple[str, object]] = [
+    ("tick query", parse_tick_query),
+    ("forge tps", parse_forge_tps),
+    ("spark tps", parse_spark_tps),
+    ("mspt", parse_paper_mspt),
+]
+
+
+def register_probe(command: str, parser, first: bool = False) -> None:
+    if first:
+        MSPT_PROBES.insert(0, (command, parser))
+    else:
+        MSPT_PROBES.append((command, parser))
+
+
+class MsptController:
+    def __init__(self, target_mspt: float, base_s: float, max_s: float, sample_s: float, probes=None):
+        self.target = float(target_mspt)
+        self.base_s = float(base_s)
+        self.max_s = max(float(max_s), self.base_s)
+        self.sample_s = float(sample_s)
+        self.probes = list(MSPT_PROBES if probes is None else probes)
+        self.probe: tuple[str, object] | None = None
+        self.factor = 1.0
+        self.mspt: float | None = None
+        self.status = "en attente"
+        self.next_sample = time.monotonic()
+
+    def interval(self) -> float:
+        return min(self.max_s, self.base_s * self.factor)
+
+    def _query(self, rcon) -> float | None:
+        candidates = [self.probe] if self.probe else self.probes
+        for cmd, parser in candidates:
+            try:
+                v = parser(rcon.cmd(cmd))
+            except Exception:
+                v = None
+            if v is not None:
+                self.probe = (cmd, parser)
+                return v
+        return None
+
+    def sample(self, rcon) -> float:
+        v = self._query(rcon)
+        if v is None:
+            self.probe = None
+            self.mspt = None
+            self.factor = 1.0
+            self.status = "indisponible"
+            # Aucune commande reconnue : on ne réessaie que rarement
+            self.next_sample = time.monotonic() + self.sample_s * 10
+            return self.interval()
+        self.observe(v)
+        self.next_sample = time.monotonic() + self.sample_s
+        return self.interval()
+
+    def observe(self, mspt: float) -> None:
+        self.mspt = mspt if self.mspt is None else 0.5 * self.mspt + 0.5 * mspt
+        ratio = self.mspt / self.target if self.target > 0 else 0.0
+        if ratio > 1.0:
+            self.factor = min(self.max_s / self.base_s, self.factor * min(MAX_STEP, max(1.1, ratio)))
+        elif ratio < LOW_RATIO:
+            self.factor = max(1.0, self.factor * RELAX)
+        self.status = "ralenti" if self.factor > 1.0 else "nominal"
+
+    def describe(self) -> str:
+        if self.mspt is None:
+            return self.status
+        s = f"{self.mspt:.1f} ms / {self.target:.0f} ms"
+        if self.factor > 1.0:
+            s += f" — ralenti ×{self.factor:.1f}"
+        return s
+
+
+def throttle_from_config(cfg) -> MsptController | None:
+    t = cfg.throttle
+    if not t.enabled:
+        return None
+    return MsptController(t.target_mspt, cfg.exploration.interval, t.max_interval, t.sample_interval)
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
+import collections
 import os
-import re
+import queue
 import select
 import shutil
 import sys
@@ -17,11 +18,17 @@ from rich.progress import BarColumn, Progress, TextColumn
 from rich.table import Table
 from rich.text import Text
 
-from spiral import next_step
+from minimap import PLAN_MAX, Minimap
+from scheduler import TELEPORTED_RE, TPScheduler
+from spiral import next_step, rebuild_state_from_steps
 from state import SaveManager, SpiralState
 from utils import human_eta
 
 RENDER_FPS = 5
+RENDER_CPU_BUDGET = 0.05
+PROGRESS_STEPS = 60
+LOG_LINES = 12
+MAP_MIN_WIDTH = 90
 LEFT_MIN_WIDTH = 44
 _left_width = LEFT_MIN_WIDTH
 _LOG_WIDTH_FROZEN = False
@@ -35,16 +42,6 @@ _wxR = XZ_MIN_W
 _wyR = Y_MAX_W
 _wzR = XZ_MIN_W
 
-OFFLINE_PATTERNS = [
-    "no entity",
-    "entity not found",
-    "player not found",
-    "cannot be found",
-    "no player was found",
-    "is not online",
-    "no targets matched",
-]
-
 
 class RawInput:
     def __init__(self, stream):
@@ -105,10 +102,9 @@ def build_header(paused: bool, auto_reason: str | None, width: int) -> Panel:
     return Panel(row, box=box.ROUNDED, width=width)
 
 
-def build_stats_panel(state: SpiralState, paused: bool, next_due: float, now: float, width: int) -> Panel:
-    table = Table.grid(expand=True)
-    table.add_column(justify="left", ratio=1)
-    table.add_column(justify="right", ratio=1)
+def _stats_rows(
+    state: SpiralState, paused: bool, next_due: float, now: float, throttle=None, verifier=None
+) -> tuple[tuple[str, str], ...]:
     remaining_tps = None
     if state.max_tps is not None and state.max_tps >= 0:
         remaining_tps = max(state.max_tps - state.step_index, 0)
@@ -116,20 +112,66 @@ def build_stats_panel(state: SpiralState, paused: bool, next_due: float, now: fl
     eta_total = None
     if remaining_tps is not None and not paused:
         eta_total = time_to_next + max(0, remaining_tps - 1) * state.interval_s
-    table.add_row("Joueur", f"{state.player}")
-    table.add_row("Dimension", _format_dimension(f"{state.dimension}"))
-    table.add_row("Hauteur (Y=)", f"{state.y}")
-    table.add_row("Chunks", f"{state.chunk_step} → {state.step_blocks} blocs")
-    table.add_row("Spawn (X)", f"{state.spawn_x}")
-    table.add_row("Spawn (Z)", f"{state.spawn_z}")
-    table.add_row(
-        "TP effectués", f"{state.step_index}{f' / {state.max_tps}' if state.max_tps not in (None, -1) else ''}"
+    rows = (
+        ("Joueur", f"{state.player}"),
+        ("Dimension", _format_dimension(f"{state.dimension}")),
+        ("Hauteur (Y=)", f"{state.y}"),
+        ("Chunks", f"{state.chunk_step} → {state.step_blocks} blocs"),
+        ("Spawn (X)", f"{state.spawn_x}"),
+        ("Spawn (Z)", f"{state.spawn_z}"),
+        ("TP effectués", f"{state.step_index}{f' / {state.max_tps}' if state.max_tps not in (None, -1) else ''}"),
+        ("Prochain TP dans", human_eta(time_to_next)),
+        ("ETA total", ("en pause" if paused else human_eta(eta_total))),
     )
-    table.add_row("Prochain TP dans", human_eta(time_to_next))
-    table.add_row("ETA total", ("en pause" if paused else human_eta(eta_total)))
+    if throttle is not None:
+        rows += (("Serveur (MSPT)", throttle.describe()), ("Intervalle", f"{state.interval_s:.1f}s"))
+    if verifier is not None:
+        rows += (("Génération", verifier.describe()),)
+    return rows
+
+
+# Lignes qui changent chaque seconde : la vue les met à jour sur place sans reconstruire le tableau
+COUNTDOWN_ROWS = ("Prochain TP dans", "ETA total")
+
+
+def _stats_panel(rows: tuple[tuple[str, str], ...], width: int, cells: dict | None = None) -> Panel:
+    table = Table.grid(expand=True)
+    table.add_column(justify="left", ratio=1)
+    table.add_column(justify="right", ratio=1)
+    for label, value in rows:
+        table.add_row(label, cells.get(label, value) if cells else value)
     return Panel(table, title="Statuts", box=box.ROUNDED, width=width)
 
 
+def build_stats_panel(
+    state: SpiralState, paused: bool, next_due: float, now: float, width: int, throttle=None, verifier=None
+) -> Panel:
+    return _stats_panel(_stats_rows(state, paused, next_due, now, throttle, verifier), width)
+
+
+def _spiral_minimap(state: SpiralState) -> Minimap:
+    # Pas déjà effectués et plan restant rejoués depuis le spawn : O(pas) une seule fois, puis O(1) par TP
+    mm = Minimap(state.spawn_x, state.spawn_z, state.step_blocks)
+    s = rebuild_state_from_steps(state, 0)
+    for _ in range(state.step_index):
+        x, z, _ = next_step(s)
+        mm.visit(x, z)
+    left = None if state.max_tps is None or state.max_tps < 0 else state.max_tps - state.step_index
+    plan = []
+    while left is None or len(plan) < left:
+        x, z, _ = next_step(s)
+        plan.append((x, z))
+        if len(plan) >= PLAN_MAX:
+            break
+    mm.set_plan(plan)
+    return mm
+
+
+def _map_panel(mm: Minimap, x: int, z: int, rows: int, width: int) -> Panel:
+    text = mm.render(x, z, max(4, width - 4), rows)
+    return Panel(text, title=f"Carte (1 point = {mm.scale} blocs)", box=box.ROUNDED, width=width, height=rows + 2)
+
+
 def _progress_color(elapsed: float, total: float) -> str:
     if total <= 0:
         return "green"
@@ -141,30 +183,134 @@ def _progress_color(elapsed: float, total: float) -> str:
     return "red"
 
 
-def build_progress_panel(interval_s: float, next_due: float, paused: bool, now: float, width: int) -> Panel:
-    elapsed = 0.0
-    if not paused:
-        elapsed = max(0.0, min(interval_s, interval_s - max(0.0, next_due - now)))
-    color = _progress_color(elapsed, float(interval_s))
-    progress = Progress(
+def _elapsed(interval_s: float, next_due: float, paused: bool, now: float) -> float:
+    if paused:
+        return 0.0
+    return max(0.0, min(interval_s, interval_s - max(0.0, next_due - now)))
+
+
+def _new_progress(color: str) -> Progress:
+    return Progress(
         TextColumn("{task.description}", justify="left"),
         BarColumn(complete_style=color, bar_width=None),
         TextColumn("{task.completed:.1f}s / {task.total:.1f}s", justify="right"),
         expand=True,
     )
+
+
+def build_progress_panel(interval_s: float, next_due: float, paused: bool, now: float, width: int) -> Panel:
+    elapsed = _elapsed(interval_s, next_due, paused, now)
+    progress = _new_progress(_progress_color(elapsed, float(interval_s)))
     progress.add_task("Temps restant", total=float(interval_s), completed=float(elapsed))
     return Panel(progress, title="Prochain TP", box=box.ROUNDED, width=width)
 
 
-def _looks_offline_or_error(resp: str) -> str | None:
-    r = resp or ""
-    r_low = r.lower()
-    if r.startswith("ERREUR RCON"):
-        return "RCON indisponible"
-    for p in OFFLINE_PATTERNS:
-        if p in r_low:
-            return "joueur introuvable"
-    return None
+# Vue retenue : les panneaux sont construits une fois et seuls les champs modifiés sont mis à jour.
+# update() indique si l'image a changé ; la cadence est bornée par un budget CPU (part d'un cœur).
+class ExplorationView:
+    def __init__(self, state: SpiralState, cpu_budget: float = RENDER_CPU_BUDGET, throttle=None, verifier=None):
+        self.state = state
+        self.throttle = throttle
+        self.verifier = verifier
+        self.minimap = _spiral_minimap(state)
+        self._map_version = None
+        self.cpu_budget = cpu_budget
+        self.cpu_s = 0.0
+        self.frames = 0
+        self._cost = 0.0
+        self._width = None
+        self._header_key = None
+        self._header = None
+        self._stats_rows = None
+        self._stats = None
+        self._countdown = {label: Text() for label in COUNTDOWN_ROWS}
+        self._prog_key = None
+        self._bar = BarColumn(complete_style="green", bar_width=None)
+        self._progress = Progress(
+            TextColumn("{task.description}", justify="left"),
+            self._bar,
+            TextColumn("{task.completed:.1f}s / {task.total:.1f}s", justify="right"),
+            expand=True,
+        )
+        self._task = self._progress.add_task("Temps restant", total=float(state.interval_s), completed=0.0)
+        self._prog_panel = None
+        # Anneau de taille fixe : ajout O(1), et le panneau garde la même hauteur quel que soit le nombre de TP
+        self.log: collections.deque = collections.deque(maxlen=LOG_LINES)
+        self._log_dirty = True
+        self._log_panel = None
+        self.renderable = None
+
+    def visit(self, x: int, z: int) -> None:
+        self.minimap.visit(x, z)
+
+    def push(self, row) -> None:
+        if row is None:
+            return
+        self.log.append(row)
+        self._log_dirty = True
+
+    def update(self, paused: bool, auto_reason: str | None, next_due: float, now: float, width: int) -> bool:
+        layout = width != self._width
+        self._width = width
+        if layout or (paused, auto_reason) != self._header_key:
+            self._header_key = (paused, auto_reason)
+            self._header = build_header(paused, auto_reason, width)
+            layout = True
+        rows = _stats_rows(self.state, paused, next_due, now, self.throttle, self.verifier)
+        # Le compte à rebours vit dans ses propres Text : seul un changement des autres lignes reconstruit le panneau
+        ticked = False
+        for label, value in rows:
+            cell = self._countdown.get(label)
+            if cell is not None and cell.plain != value:
+                cell.plain = value
+                ticked = True
+        static = tuple(row for row in rows if row[0] not in self._countdown)
+        if layout or static != self._stats_rows or self.minimap.version != self._map_version:
+            self._stats_rows = static
+            self._map_version = self.minimap.version
+            if width >= MAP_MIN_WIDTH:
+                map_w = max(30, int(width * 0.4))
+                grid = Table.grid()
+                grid.add_row(
+                    _stats_panel(rows, width - map_w, self._countdown),
+                    _map_panel(self.minimap, self.state.current_x, self.state.current_z, len(rows), map_w),
+                )
+                self._stats = grid
+            else:
+                self._stats = _stats_panel(rows, width, self._countdown)
+            layout = True
+        interval = float(self.state.interval_s)
+        # Au-delà de la résolution de la barre, une nouvelle image ne montrerait rien de plus
+        step = max(1.0 / RENDER_FPS, interval / PROGRESS_STEPS)
+        elapsed = min(interval, int(_elapsed(interval, next_due, paused, now) / step) * step)
+        color = _progress_color(elapsed, interval)
+        prog_key = (interval, elapsed, color)
+        changed = layout or ticked or prog_key != self._prog_key
+        if prog_key != self._prog_key:
+            self._prog_key = prog_key
+            self._bar.complete_style = color
+            self._progress.update(self._task, total=interval, completed=elapsed)
+        if layout or self._log_dirty:
+            self._log_panel = Panel(
+                Group(*self.log), title="Derniers TP", box=box.ROUNDED, width=width, height=LOG_LINES + 2
+            )
+            self._log_dirty = False
+            layout = changed = True
+        if layout:
+            self._prog_panel = Panel(self._progress, title="Prochain TP", box=box.ROUNDED, width=width)
+            parts = Group(self._header, self._stats, self._prog_panel, self._log_panel)
+            self.renderable = Group(Text(""), Panel(parts, box=box.DOUBLE, width=width))
+        return changed
+
+    def charge(self, cpu_s: float) -> None:
+        self.cpu_s += cpu_s
+        self.frames += 1
+        self._cost = cpu_s if self.frames == 1 else 0.8 * self._cost + 0.2 * cpu_s
+
+    def frame_interval(self) -> float:
+        if self.cpu_budget <= 0:
+            return 1.0 / RENDER_FPS
+        return max(1.0 / RENDER_FPS, self._cost / self.cpu_budget)
 
 
 def _target_width() -> int:
@@ -172,12 +318,6 @@ def _target_width() -> int:
     return max(80, min(int(cols * 0.68), 120))
 
 
-_TELEPORTED_RE = re.compile(
-    r"^Teleported\s+.+?\s+to\s+([+-]?\d+(?:\.\d+)?),\s*([+-]?\d+(?:\.\d+)?),\s*([+-]?\d+(?:\.\d+)?)\s*$",
-    re.IGNORECASE,
-)
-
-
 def _fmt_num(n: str | float | int) -> str:
     try:
         f = float(n)
@@ -237,7 +377,7 @@ def _build_right_segment(resp: str, player: str, cmd_x: int, cmd_y: int, cmd_z:
             f"[white]Teleported {player} to[/white] "
             f"{_coords_error_pad_right(cmd_x, cmd_y, cmd_z)} [yellow](simulation)[/yellow]"
         )
-    m = _TELEPORTED_RE.match((resp or "").strip())
+    m = TELEPORTED_RE.match((resp or "").strip())
     if m:
         rx, ry, rz = (m.group(1), m.group(2), m.group(3))
         return f"[white]Teleported {player} to[/white] {_coords_dual_pad_right(rx, ry, rz)}"
@@ -254,7 +394,7 @@ def _fmt_ts_markup() -> str:
     )
 
 
-def _print_aligned_log(left_markup: str, right_markup: str) -> None:
+def _aligned_log_row(left_markup: str, right_markup: str) -> Table:
     global _left_width, _LOG_WIDTH_FROZEN
     left_text = Text.from_markup(left_markup)
     left_text.no_wrap = True
@@ -272,83 +412,184 @@ def _print_aligned_log(left_markup: str, right_markup: str) -> None:
     grid.add_column(width=1, justify="center", no_wrap=True)
     grid.add_column(ratio=1, no_wrap=True)
     grid.add_row(left_text, Text("│", style="dim"), right_text)
-    print(grid)
-
-
-def run_loop(state: SpiralState, save: SaveManager, rcon) -> str | None:
-    if state.step_index == 0 and (state.current_x, state.current_z) == (0, 0):
-        state.current_x = state.spawn_x
-        state.current_z = state.spawn_z
-    paused = False
-    auto_reason: str | None = None
-    next_due = time.time() + state.interval_s
-    force_next = False
-    with Live(refresh_per_second=RENDER_FPS, screen=False) as live, RawInput(sys.stdin):
-        next_render = 0.0
+    return grid
+
+
+def run_loop(
+    state: SpiralState,
+    save: SaveManager,
+    rcon,
+    history=None,
+    watcher=None,
+    stop_at: float | None = None,
+    max_catchup: int = 1,
+    throttle=None,
+    log_file: str = "",
+    auto_resume=None,
+    verifier=None,
+) -> str | None:
+    sink = None
+    if log_file:
+        try:
+            sink = TPLogFile(log_file)
+        except OSError as e:
+            print(f"[yellow]Journal des TP indisponible ({log_file}) : {e}[/yellow]")
+    sched = TPScheduler(
+        state,
+        save,
+        rcon,
+        history,
+        max_catchup=max_catchup,
+        stop_at=stop_at,
+        formatter=_format_tp_event(state.player, sink),
+        throttle=throttle,
+        verifier=verifier,
+    )
+
+    def _on_config(new, old):
+        if new.exploration.interval != old.exploration.interval:
+            sched.retune(new.exploration.interval)
+
+    if watcher is not None:
+        watcher.subscribe(_on_config)
+    resumer = auto_resume(sched) if auto_resume is not None else None
+    if resumer is not None:
+        resumer.start()
+    sched.start()
+    try:
+        return _run_loop(sched)
+    finally:
+        if resumer is not None:
+            resumer.stop()
+        sched.stop()
+        sched.join()
+        if sink is not None:
+            sink.close()
+        if watcher is not None:
+            watcher.unsubscribe(_on_config)
+
+
+class TPLogFile:
+    def __init__(self, path: str):
+        self.path = path
+        self.f = open(path, "a", encoding="utf-8", buffering=1)
+
+    def write(self, ev) -> None:
+        ts = time.strftime("%Y-%m-%d %H:%M:%S")
+        resp = " ".join((ev.resp or "").split())
+        self.f.write(f"{ts} TP {ev.step} -> X={ev.x} Y={ev.y} Z={ev.z} | {resp}\n")
+
+    def close(self) -> None:
+        try:
+            self.f.close()
+        except OSError:
+            pass
+
+
+def _format_tp_event(player: str, sink: TPLogFile | None = None):
+    def fmt(ev) -> Table:
+        if sink is not None:
+            try:
+                sink.write(ev)
+            except OSError:
+                pass
+        ts = _fmt_ts_markup()
+        left = f"{ts} [bold cyan]TP {ev.step}[/bold cyan] -> {_coords_dual_pad_left(ev.x, ev.y, ev.z)}"
+        right = _build_right_segment(ev.resp, player, ev.x, ev.y, ev.z)
+        return _aligned_log_row(left, right)
+
+    return fmt
+
+
+def _run_loop(sched: TPScheduler) -> str | None:
+    state = sched.state
+    view = ExplorationView(state, throttle=sched.throttle, verifier=sched.verifier)
+    with Live(auto_refresh=False, screen=False) as live, RawInput(sys.stdin):
         width = _target_width()
         next_width_check = time.time() + 2.0
-        dirty = True
         while True:
+            while True:
+                try:
+                    ev = sched.events.get_nowait()
+                except queue.Empty:
+                    break
+                if ev is None:
+                    return sched.result
+                view.push(ev.line)
+                view.visit(ev.x, ev.z)
             now = time.time()
             if now >= next_width_check:
-                new_w = _target_width()
-                if new_w != width:
-                    width = new_w
-                    dirty = True
+                width = _target_width()
                 next_width_check = now + 2.0
-            if dirty or now >= next_render:
-                adj_width = max(60, width - 5)
-                header = build_header(paused, auto_reason, adj_width)
-                stats = build_stats_panel(state, paused, next_due, now, adj_width)
-                prog = build_progress_panel(state.interval_s, next_due, paused, now, adj_width)
-                body = Panel(Group(header, stats, prog), box=box.DOUBLE, width=adj_width)
-                live.update(Group(Text(""), body))
-                next_render = now + 1.0 / RENDER_FPS
-                dirty = False
-            time_to_next = max(0.0, next_due - now)
-            timeout = min(1.0 / RENDER_FPS, max(0.05, time_to_next))
-            rlist, _, _ = select.select([sys.stdin], [], [], timeout)
+            # Le planificateur raisonne en temps monotone : on affiche avec la même horloge
+            t0 = time.process_time()
+            if view.update(sched.paused, sched.auto_reason, sched.next_due, time.monotonic(), max(60, width - 5)):
+                live.update(view.renderable, refresh=True)
+                view.charge(time.process_time() - t0)
+            rlist, _, _ = select.select([sys.stdin], [], [], view.frame_interval())
             if rlist:
                 ch = os.read(sys.stdin.fileno(), 1)
                 if ch:
                     k = ch.decode(errors="ignore")
                     k_low = k.lower()
                     if k_low == "n":
-                        force_next = True
-                        save.save(state)
-                        dirty = True
+                        sched.request_next()
                     elif k_low == "p":
-                        paused = not paused
-                        if not paused:
-                            auto_reason = None
-                            next_due = time.time() + state.interval_s
-                        save.save(state)
-                        dirty = True
+                        sched.toggle_pause()
                     elif k_low == "c":
-                        save.save(state)
+                        sched.stop()
+                        sched.join()
                         return "CONTROL"
                     elif k == "\x1b":
-                        save.save(state)
+                        sched.stop()
+                        sched.join()
                         return None
-            if (not paused and time.time() >= next_due) or force_next:
-                if state.max_tps is not None and state.max_tps >= 0 and state.step_index >= state.max_tps:
-                    save.save(state)
-                    return None
-                x, z, state = next_step(state)
-                cmd = f"execute in {state.dimension} run tp {state.player} {x} {state.y} {z}"
+
+
+def build_viewer_header(owner: dict | None, width: int) -> Panel:
+    title = Text("Spirale Carrée RCON", style="bold cyan")
+    who = ""
+    if owner:
+        who = f" — session PID {owner.get('pid', '?')} sur {owner.get('host', '?')}"
+    subtitle = Text.from_markup(f"[bold]Lecture seule[/bold]{who} — {_kbd_tag('Esc')}[dim]=Quitter[/dim]")
+    subtitle.no_wrap = True
+    subtitle.overflow = "ellipsis"
+    row = Table.grid(expand=True)
+    row.add_column(no_wrap=True, ratio=1)
+    row.add_row(Align.center(title))
+    row.add_row(Align.left(subtitle))
+    return Panel(row, box=box.ROUNDED, width=width)
+
+
+def run_viewer(save: SaveManager, poll_s: float = 1.0) -> None:
+    state = save.load() if save.exists() else None
+    seen = save.mtime_key()
+    last_change = time.time()
+    with Live(auto_refresh=False, screen=False) as live, RawInput(sys.stdin):
+        while True:
+            key = save.mtime_key()
+            if key != seen:
+                seen = key
                 try:
-                    resp = rcon.cmd(cmd)
-                except Exception as e:
-                    resp = f"ERREUR RCON : {e}"
-                ts = _fmt_ts_markup()
-                left = f"{ts} [bold cyan]TP {state.step_index}[/bold cyan] -> {_coords_dual_pad_left(x, state.y, z)}"
-                right = _build_right_segment(resp, state.player, x, state.y, z)
-                _print_aligned_log(left, right)
-                issue = _looks_offline_or_error(resp)
-                if issue:
-                    paused = True
-                    auto_reason = issue
-                save.save(state)
-                next_due = time.time() + state.interval_s
-                force_next = False
-                dirty = True
+                    state = save.load()
+                    last_change = time.time()
+                except (OSError, ValueError):
+                    pass
+            if save.lock.acquire():
+                # La session propriétaire s'est terminée
+                save.lock.release()
+                return
+            now = time.time()
+            adj_width = max(60, _target_width() - 5)
+            parts = [build_viewer_header(save.lock_owner(), adj_width)]
+            if state is not None:
+                next_due = last_change + state.interval_s
+                parts.append(build_stats_panel(state, False, next_due, now, adj_width))
+                parts.append(build_progress_panel(state.interval_s, next_due, False, now, adj_width))
+            live.update(Group(Text(""), Panel(Group(*parts), box=box.DOUBLE, width=adj_width)))
+            live.refresh()
+            rlist, _, _ = select.select([sys.stdin], [], [], poll_s)
+            if rlist:
+                ch = os.read(sys.stdin.fileno(), 1)
+                if ch == b"\x1b":
+                    return
@@ -0,0 +1,214 @@
+import json
+import os
+import re
+import struct
+
+import metrics
+from spiral import next_step, rebuild_state_from_steps
+
+_COLOR_RE = re.compile(r"§.")
+_LOCATION = struct.Struct(">I")
+
+
+def retry_path(save_path: str) -> str:
+    return save_path + ".retry"
+
+
+def dimension_dir(world_dir: str, dimension: str) -> str:
+    if dimension in ("minecraft:overworld", "overworld"):
+        return world_dir
+    if dimension in ("minecraft:the_nether", "the_nether"):
+        return os.path.join(world_dir, "DIM-1")
+    if dimension in ("minecraft:the_end", "the_end"):
+        return os.path.join(world_dir, "DIM1")
+    ns, _, name = dimension.partition(":")
+    if not name:
+        ns, name = "minecraft", ns
+    return os.path.join(world_dir, "dimensions", ns, *name.split("/"))
+
+
+def chunk_in_region(region_dir: str, x: int, z: int) -> bool:
+    cx, cz = x >> 4, z >> 4
+    path = os.path.join(region_dir, f"r.{cx >> 5}.{cz >> 5}.mca")
+    try:
+        with open(path, "rb") as f:
+            # Seule l'entrée de la table d'emplacements est lue : 4 octets sur les 4 Kio d'en-tête
+            f.seek(4 * ((cx & 31) + (cz & 31) * 32))
+            raw = f.read(_LOCATION.size)
+    except OSError:
+        return False
+    return len(raw) == _LOCATION.size and _LOCATION.unpack(raw)[0] != 0
+
+
+def footprint(x: int, z: int, half: int) -> list[tuple[int, int]]:
+    return [(x - half, z - half), (x + half, z - half), (x - half, z + half), (x + half, z + half)]
+
+
+def parse_test(resp: str) -> bool | None:
+    r = _COLOR_RE.sub("", resp or "").lower()
+    if "test passed" in r:
+        return True
+    if "test failed" in r:
+        return False
+    return None
+
+
+# Vérifie après coup que la zone d'un TP a bien été générée : soit par une seule commande RCON
+# chaînant « if loaded » sur les coins de l'emprise (joueur encore sur place), soit en lisant
+# l'en-tête des fichiers région. Les TP en défaut vont dans une file bornée, rejouée en fin de run.
+class GenerationCheck:
+    def __init__(
+        self,
+        save_path: str,
+        method: str = "loaded",
+        half: int = 256,
+        world_dir: str = "",
+        attempts: int = 2,
+        settle_s: float = 10.0,
+        max_queue: int = 1000,
+    ):
+        self.path = retry_path(save_path)
+        self.method = method
+        self.half = max(0, int(half))
+        self.world_dir = world_dir
+        self.attempts = max(1, int(attempts))
+        self.settle_s = float(settle_s)
+        self.max_queue = max(1, int(max_queue))
+        self.status = "en attente"
+        self.available = True
+        self.pending: list[dict] = []
+        # Positions abandonnées après attempts essais : ni l'audit ni un contrôle ne les remettent en file
+        self.exhausted: set[tuple[int, int]] = set()
+        self._load()
+
+    @staticmethod
+    def from_config(cfg, save_path: str):
+        v = cfg.verify
+        if not v.enabled:
+            return None
+        half = v.radius_blocks or cfg.exploration.step_blocks // 2
+        world = v.world_dir or os.path.dirname(cfg.nbt.playerdata.rstrip("/"))
+        return GenerationCheck(save_path, v.method, half, world, v.attempts, v.settle_s, v.max_queue)
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, list):
+                data = {"pending": data}
+            self.pending = [
+                {"step": int(p["step"]), "x": int(p["x"]), "z": int(p["z"]), "tries": int(p["tries"])}
+                for p in data.get("pending", [])
+            ]
+            self.exhausted = {(int(x), int(z)) for x, z in data.get("exhausted", [])}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            self.pending = []
+            self.exhausted = set()
+        metrics.VERIFY_PENDING.set(len(self.pending))
+
+    def _store(self):
+        metrics.VERIFY_PENDING.set(len(self.pending))
+        tmp = self.path + ".tmp"
+        try:
+            if not self.pending and not self.exhausted:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                return
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"pending": self.pending, "exhausted": sorted(self.exhausted)}, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def _in_regions(self, dimension: str, x: int, z: int) -> bool:
+        region = os.path.join(dimension_dir(self.world_dir, dimension), "region")
+        return all(chunk_in_region(region, cx, cz) for cx, cz in footprint(x, z, self.half))
+
+    @staticmethod
+    def flush(rcon):
+        # Les chunks ne sont écrits dans les fichiers région qu'à la sauvegarde du monde : une seule sauvegarde
+        # par passe, qui bloque le thread principal du serveur le temps de l'écriture
+        try:
+            rcon.cmd("save-all flush")
+        except Exception:
+            pass
+
+    def probe(self, rcon, dimension: str, y: int, x: int, z: int) -> bool | None:
+        if self.method == "region":
+            # L'appelant a fait flush() au préalable
+            return self._in_regions(dimension, x, z)
+        if not self.available:
+            return None
+        conds = " ".join(f"if loaded {cx} {y} {cz}" for cx, cz in footprint(x, z, self.half))
+        try:
+            ok = parse_test(rcon.cmd(f"execute in {dimension} {conds}"))
+        except Exception:
+            return None
+        if ok is None:
+            # Serveur antérieur à « execute if loaded » : on n'insiste pas
+            self.available = False
+            self.status = "indisponible"
+        return ok
+
+    # Juste avant le TP suivant, le joueur est encore sur place : les chunks générés sont chargés
+    def check(self, rcon, dimension: str, y: int, step: int, x: int, z: int) -> bool | None:
+        if self.method == "region":
+            return None
+        ok = self.probe(rcon, dimension, y, x, z)
+        if ok is not None:
+            metrics.VERIFY_CHECKS.inc(result="ok" if ok else "manquant")
+        if ok is False:
+            self.add(step, x, z)
+        return ok
+
+    # Mode région : un seul passage en fin de run sur toutes les étapes depuis le spawn (4 lectures de 4 octets
+    # par étape), après une seule sauvegarde du monde
+    def audit(self, rcon, state):
+        if self.method != "region":
+            return
+        self.flush(rcon)
+        s = rebuild_state_from_steps(state, 0)
+        for _ in range(state.step_index):
+            x, z, _ = next_step(s)
+            ok = self._in_regions(state.dimension, x, z)
+            metrics.VERIFY_CHECKS.inc(result="ok" if ok else "manquant")
+            if not ok:
+                self.add(s.step_index, x, z)
+
+    def add(self, step: int, x: int, z: int):
+        if (x, z) in self.exhausted or any(p["x"] == x and p["z"] == z for p in self.pending):
+            return
+        if len(self.pending) >= self.max_queue:
+            metrics.VERIFY_DROPPED.inc()
+            return
+        self.pending.append({"step": step, "x": x, "z": z, "tries": 0})
+        self._store()
+
+    def _settle(self, p: dict, ok: bool | None):
+        if ok:
+            self.pending.remove(p)
+        else:
+            p["tries"] += 1
+            if p["tries"] >= self.attempts:
+                self.pending.remove(p)
+                self.exhausted.add((p["x"], p["z"]))
+                metrics.VERIFY_DROPPED.inc()
+
+    def settle(self, p: dict, ok: bool | None):
+        self._settle(p, ok)
+        self._store()
+
+    # Mode région : après les TP de reprise, une seule sauvegarde du monde puis la lecture des en-têtes
+    def settle_regions(self, rcon, dimension: str, items: list[dict]):
+        if not items:
+            return
+        self.flush(rcon)
+        for p in items:
+            self._settle(p, self._in_regions(dimension, p["x"], p["z"]))
+        self._store()
+
+    def describe(self) -> str:
+        if self.method == "loaded" and not self.available:
+            return self.status
+        n = len(self.pending)
+        return f"{n} TP à reprendre" if n else "OK"
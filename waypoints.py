@@ -0,0 +1,56 @@
+import json
+import math
+import os
+
+
+def waypoints_path(save_path: str) -> str:
+    return save_path + ".waypoints"
+
+
+# {"waypoints": [{"name", "dimension", "x", "y", "z"}, ...], "tour_pos": index du prochain pas de la tournée}
+def load_waypoints(path: str) -> tuple[list[dict], int]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        wps = [
+            {
+                "name": str(w["name"]),
+                "dimension": str(w["dimension"]),
+                "x": int(w["x"]),
+                "y": int(w["y"]),
+                "z": int(w["z"]),
+            }
+            for w in data.get("waypoints", [])
+        ]
+        return wps, max(0, int(data.get("tour_pos", 0)))
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return [], 0
+
+
+def save_waypoints(path: str, waypoints: list[dict], tour_pos: int = 0) -> None:
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"waypoints": waypoints, "tour_pos": tour_pos}, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def tour_steps(waypoints: list[dict], step_blocks: int) -> list[tuple[str, int, int, int]]:
+    # Points intermédiaires espacés d'au plus step_blocks sur chaque axe entre deux points de passage ;
+    # un changement de dimension est un saut direct, sans couloir
+    step_blocks = max(1, int(step_blocks))
+    out: list[tuple[str, int, int, int]] = []
+    prev = None
+    for w in waypoints:
+        dim, x, y, z = w["dimension"], w["x"], w["y"], w["z"]
+        if prev is not None and prev[0] == dim:
+            _, px, py, pz = prev
+            n = max(1, math.ceil(max(abs(x - px), abs(z - pz)) / step_blocks))
+            for i in range(1, n):
+                t = i / n
+                out.append((dim, round(px + (x - px) * t), round(py + (y - py) * t), round(pz + (z - pz) * t)))
+        out.append((dim, x, y, z))
+        prev = (dim, x, y, z)
+    return out